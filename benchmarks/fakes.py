@@ -0,0 +1,210 @@
+"""
+In-memory fakes of the Google API clients, serving a generated fleet of projects, topics and subscriptions.
+Responses are real protobuf messages, so services and views run their usual code paths.
+Swapped in by Client.use(publisher=..., subscriber=..., projects=..., metrics=...)
+"""
+import math
+import re
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+
+from google.cloud.monitoring_v3 import TimeSeries
+from google.cloud.resourcemanager_v3.types import Project
+from google.pubsub_v1.types import (
+    ListSubscriptionsResponse,
+    ListTopicsResponse,
+    ListTopicSubscriptionsResponse,
+    Subscription,
+    Topic,
+)
+
+DOUBLE = 3  # google.api.MetricDescriptor.ValueType.DOUBLE
+REDUCERS = {"REDUCE_MAX": max, "REDUCE_MIN": min, "REDUCE_MEAN": lambda values: sum(values) / len(values)}
+
+
+@dataclass
+class Latency:
+    """
+    Injected latency in seconds, of every call and of every further page of a listing
+    """
+
+    call: float = 0.0
+    page: float = 0.0
+
+    def wait(self, seconds: float):
+        if seconds:
+            time.sleep(seconds)
+
+
+@dataclass
+class Fleet:
+    """
+    Deterministic fleet, every topic has the same number of subscriptions and every 10th subscription dead letters
+    """
+
+    projects: int = 10
+    topics: int = 50  # per project
+    subscriptions: int = 3  # per topic
+    page_size: int = 100
+
+    def project_ids(self) -> List[str]:
+        return [f"project-{p:03}" for p in range(self.projects)]
+
+    def topic_names(self, project_id: str) -> List[str]:
+        return [f"projects/{project_id}/topics/topic-{t:04}" for t in range(self.topics)]
+
+    def subscription_names(self, project_id: str) -> List[str]:
+        return [
+            f"projects/{project_id}/subscriptions/topic-{t:04}-sub-{s}"
+            for t in range(self.topics)
+            for s in range(self.subscriptions)
+        ]
+
+    def topic(self, name: str) -> Topic:
+        return Topic(name=name, labels={"team": f"team-{_hash(name) % 7}"})
+
+    def subscription(self, name: str) -> Subscription:
+        _, project_id, _, subscription_id = name.split("/")
+        topic_id = subscription_id.rsplit("-sub-", 1)[0]
+        sub = Subscription(name=name, topic=f"projects/{project_id}/topics/{topic_id}", ack_deadline_seconds=10)
+        if _hash(name) % 10 == 0:
+            sub.dead_letter_policy.dead_letter_topic = f"projects/{project_id}/topics/dead-letter"
+            sub.dead_letter_policy.max_delivery_attempts = 5
+        return sub
+
+
+class _Pager:
+    def __init__(self, items: list, field: str, response_cls, page_size: int, latency: Latency) -> None:
+        self.items = items
+        self.field = field
+        self.response_cls = response_cls
+        self.page_size = page_size
+        self.latency = latency
+
+    @property
+    def pages(self) -> Iterator:
+        for i in range(0, len(self.items), self.page_size):
+            if i:
+                self.latency.wait(self.latency.page)
+            yield self.response_cls({self.field: self.items[i : i + self.page_size]})
+
+    def __iter__(self):
+        for page in self.pages:
+            yield from getattr(page, self.field)
+
+
+class FakePublisherClient:
+    def __init__(self, fleet: Fleet, latency: Latency) -> None:
+        self.fleet = fleet
+        self.latency = latency
+
+    def get_topic(self, topic: str) -> Topic:
+        self.latency.wait(self.latency.call)
+        return self.fleet.topic(topic)
+
+    def list_topics(self, project: str) -> _Pager:
+        self.latency.wait(self.latency.call)
+        topics = [self.fleet.topic(name) for name in self.fleet.topic_names(project.split("/")[1])]
+        return _Pager(topics, "topics", ListTopicsResponse, self.fleet.page_size, self.latency)
+
+    def list_topic_subscriptions(self, topic: str) -> _Pager:
+        self.latency.wait(self.latency.call)
+        project_id = topic.split("/")[1]
+        names = self.fleet.subscription_names(project_id)
+        names = [name for name in names if self.fleet.subscription(name).topic == topic]
+        return _Pager(names, "subscriptions", ListTopicSubscriptionsResponse, self.fleet.page_size, self.latency)
+
+
+class FakeSubscriberClient:
+    def __init__(self, fleet: Fleet, latency: Latency) -> None:
+        self.fleet = fleet
+        self.latency = latency
+
+    def get_subscription(self, subscription: str) -> Subscription:
+        self.latency.wait(self.latency.call)
+        return self.fleet.subscription(subscription)
+
+    def list_subscriptions(self, project: str) -> _Pager:
+        self.latency.wait(self.latency.call)
+        subs = [self.fleet.subscription(name) for name in self.fleet.subscription_names(project.split("/")[1])]
+        return _Pager(subs, "subscriptions", ListSubscriptionsResponse, self.fleet.page_size, self.latency)
+
+
+class FakeProjectsClient:
+    def __init__(self, fleet: Fleet, latency: Latency) -> None:
+        self.fleet = fleet
+        self.latency = latency
+
+    def search_projects(self) -> Iterator[Project]:
+        self.latency.wait(self.latency.call)
+        return iter([Project(project_id=project_id) for project_id in self.fleet.project_ids()])
+
+
+class FakeMetricServiceClient:
+    """
+    Series of every subscription and topic of the fleet, generated for the requested interval.
+    Understands filters made by MetricsService: metric type, one_of() or single resource ids, group by and reducers.
+    """
+
+    def __init__(self, fleet: Fleet, latency: Latency) -> None:
+        self.fleet = fleet
+        self.latency = latency
+
+    def list_time_series(self, request: dict, timeout: Optional[float] = None) -> List[TimeSeries]:
+        self.latency.wait(self.latency.call)
+        project_id = request["name"].split("/")[1]
+        metric_filter = request["filter"]
+        metric_type = re.search(r'metric.type = "([^"]+)"', metric_filter).group(1)
+        label = "topic_id" if "/topic/" in metric_type else "subscription_id"
+        ids = _filter_ids(metric_filter, label)
+        if ids is None:
+            names = self.fleet.topic_names if label == "topic_id" else self.fleet.subscription_names
+            ids = [name.split("/")[-1] for name in names(project_id)]
+
+        aggregation = request.get("aggregation")
+        period = aggregation.alignment_period.total_seconds() if aggregation else 60
+        reducer = aggregation.cross_series_reducer.name if aggregation else "REDUCE_NONE"
+        grouped = reducer == "REDUCE_NONE" or f"resource.label.{label}" in aggregation.group_by_fields
+        start = request["interval"].start_time.timestamp()
+        end = request["interval"].end_time.timestamp()
+        timestamps = [end - i * period for i in range(max(int((end - start) // period), 1))]  # newest first
+
+        series: Dict[str, List[float]] = {
+            resource_id: [_value(metric_type, resource_id, timestamp) for timestamp in timestamps]
+            for resource_id in ids
+        }
+        if not grouped:  # reduced into one series
+            reduce = REDUCERS.get(reducer, sum)
+            series = {"": [reduce(values) for values in zip(*series.values())] if series else []}
+        return [_time_series(project_id, label, key, timestamps, values) for key, values in series.items()]
+
+
+def _hash(text: str) -> int:
+    return zlib.crc32(text.encode("utf-8"))
+
+
+def _filter_ids(metric_filter: str, label: str) -> Optional[List[str]]:
+    one_of = re.search(rf"resource.labels.{label} = one_of\(([^)]*)\)", metric_filter)
+    if one_of:
+        return re.findall(r'"([^"]+)"', one_of.group(1))
+    single = re.search(rf'resource.labels.{label} = "([^"]+)"', metric_filter)
+    return [single.group(1)] if single else None
+
+
+def _value(metric_type: str, resource_id: str, timestamp: float) -> float:
+    base = _hash(metric_type + resource_id) % 1000
+    return base + base / 2 * math.sin(timestamp / 600 + base)
+
+
+def _time_series(project_id: str, label: str, resource_id: str, timestamps: List[float], values: List[float]):
+    labels = {"project_id": project_id}
+    if resource_id:
+        labels[label] = resource_id
+    points = [
+        {"interval": {"end_time": datetime.fromtimestamp(timestamp, timezone.utc)}, "value": {"double_value": value}}
+        for timestamp, value in zip(timestamps, values)
+    ]
+    return TimeSeries(resource={"type": f"pubsub_{label[:-3]}", "labels": labels}, value_type=DOUBLE, points=points)
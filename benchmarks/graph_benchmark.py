@@ -0,0 +1,43 @@
+"""
+Redraw latency of Graph, with and without the canvas cache
+
+    python -m benchmarks.graph_benchmark
+"""
+import io
+import math
+import time
+
+from rich.console import Console
+
+from pubsub_meta.graph import Graph, clear_canvas_cache
+from pubsub_meta.types import TimeSeries
+
+ROUNDS = 50
+SIZES = [(60, 15), (120, 15), (60, 15)]  # resize there and back
+
+
+def _series(size: int) -> TimeSeries:
+    return TimeSeries.from_points((1_600_000_000 + i * 60.0, 1000 + 500 * math.sin(i / 20)) for i in range(size))
+
+
+def _redraw(graph: Graph, width: int, height: int, cached: bool) -> float:
+    console = Console(file=io.StringIO(), width=width, height=height, force_terminal=True)
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        if not cached:
+            clear_canvas_cache()
+        console.print(graph)
+    return (time.perf_counter() - start) / ROUNDS * 1000
+
+
+def main():
+    for points in [60, 1_440, 10_080]:  # hour, day, week of minute points
+        graph = Graph(_series(points), "sent_message_count")
+        for width, height in SIZES:
+            before = _redraw(graph, width, height, cached=False)
+            after = _redraw(graph, width, height, cached=True)
+            print(f"points={points:>6} size={width}x{height}  uncached={before:8.2f} ms  cached={after:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
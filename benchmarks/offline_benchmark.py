@@ -0,0 +1,305 @@
+"""
+Latency of listing, picking, metrics fetch and full-frame render against in-memory fakes of the Google clients.
+Runs without network nor credentials, in a temporary PUBSUB_META_HOME.
+
+    python -m benchmarks.offline_benchmark [--projects 10] [--topics 50] [--subscriptions 3] [--latency 0.05]
+"""
+import argparse
+import io
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, List
+
+os.environ["PUBSUB_META_HOME"] = tempfile.mkdtemp(prefix="pubsub-meta-benchmark-")  # before pubsub_meta.const
+
+from rich.console import Console  # noqa: E402
+from rich.live import Live  # noqa: E402
+
+from benchmarks.fakes import (  # noqa: E402
+    FakeMetricServiceClient,
+    FakeProjectsClient,
+    FakePublisherClient,
+    FakeSubscriberClient,
+    Fleet,
+    Latency,
+)
+from pubsub_meta import const  # noqa: E402
+from pubsub_meta.client import Client  # noqa: E402
+from pubsub_meta.config import Config  # noqa: E402
+from pubsub_meta.logger import Logger  # noqa: E402
+from pubsub_meta.service.cache_service import CacheService  # noqa: E402
+from pubsub_meta.service.history_service import HistoryService  # noqa: E402
+from pubsub_meta.service.inventory_service import InventoryService  # noqa: E402
+from pubsub_meta.service.inventory_store import InventoryStore  # noqa: E402
+from pubsub_meta.service.metrics_service import MetricsService  # noqa: E402
+from pubsub_meta.service.project_service import ProjectService  # noqa: E402
+from pubsub_meta.service.subscription_service import SubscriptionService  # noqa: E402
+from pubsub_meta.service.topic_service import TopicService  # noqa: E402
+from pubsub_meta.types import SubscriptionParsed  # noqa: E402
+from pubsub_meta.util.concurrent_utils import BatchStream  # noqa: E402
+from pubsub_meta.util.fuzzy_picker import TrigramIndex  # noqa: E402
+from pubsub_meta.view.backlog_view import RANKINGS  # noqa: E402
+from pubsub_meta.window import Nav, Tab, Window  # noqa: E402
+
+ROUNDS = 5
+WIDTH, HEIGHT = 180, 50
+QUERY = "topic-0042-sub-1"  # typed one key at a time
+LIMIT = 30  # matches shown by the picker
+VIEWS = [
+    (Nav.topic, Tab.detail),
+    (Nav.topic, Tab.metrics),
+    (Nav.subscription, Tab.detail),
+    (Nav.subscription, Tab.metrics),
+    (Nav.backlog, Tab.detail),
+]
+
+
+class RecordingExecutor(ThreadPoolExecutor):
+    """
+    Executor of a view, keeping submitted futures so a frame is complete once all of them are
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.futures: List[Future] = []
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        future = super().submit(fn, *args, **kwargs)
+        self.futures.append(future)
+        return future
+
+    def drain(self) -> List[Future]:
+        futures, self.futures = self.futures, []
+        return futures
+
+
+def _report(name: str, ms: float, note: str = ""):
+    print(f"{name:<44} {ms:10.2f} ms  {note}")
+
+
+def _median(fn: Callable[[], None], rounds: int = ROUNDS) -> float:
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+class Bench:
+    """
+    Services and window of the app wired as in the CLI, with fake clients swapped in
+    """
+
+    def __init__(self, fleet: Fleet, latency: Latency) -> None:
+        for directory in [const.PUBSUB_META_HISTORY, const.PUBSUB_META_CACHE]:
+            Path(directory).mkdir(parents=True, exist_ok=True)
+        for file in [
+            const.PUBSUB_META_PROJECTS,
+            const.PUBSUB_META_TOPIC_HISTORY,
+            const.PUBSUB_META_SUBSCRIPTION_HISTORY,
+        ]:
+            Path(file).touch()
+        self.fleet = fleet
+        self.console = Console(file=io.StringIO(), width=WIDTH, height=HEIGHT, force_terminal=True)
+        self.config = Config()
+        self.config.write_default()
+        self.logger = Logger("pubsub-meta-benchmark")
+        self.client = Client(self.console, self.config)
+        self.client.use(
+            publisher=FakePublisherClient(fleet, latency),
+            subscriber=FakeSubscriberClient(fleet, latency),
+            projects=FakeProjectsClient(fleet, latency),
+            metrics=FakeMetricServiceClient(fleet, latency),
+        )
+        self.project_service = ProjectService(self.console, self.config, self.client)
+        self.inventory_service = InventoryService(self.logger, self.client, InventoryStore())
+        self.cache_service = CacheService(self.logger, self.inventory_service.store)
+        self.topic_service = TopicService(
+            self.console,
+            self.logger,
+            self.config,
+            self.client,
+            self.project_service,
+            self.cache_service,
+            self.inventory_service,
+        )
+        self.subscription_service = SubscriptionService(
+            self.console,
+            self.logger,
+            self.config,
+            self.client,
+            self.project_service,
+            self.cache_service,
+            self.inventory_service,
+        )
+        self.history_service = HistoryService(self.console, self.config, self.topic_service, self.subscription_service)
+        self.metrics_service = MetricsService(self.client, self.logger)
+
+
+def listing(bench: Bench) -> List[str]:
+    print("Listing")
+    project_ids = bench.fleet.project_ids()
+    _report("projects", _median(bench.project_service.fetch_projects))
+
+    def one_project():
+        bench.subscription_service.invalidate_cache()
+        bench.subscription_service._list_subscription_names(project_ids[0])
+
+    _report("subscriptions of a project, uncached", _median(one_project))
+
+    def stream(cached: bool) -> Callable[[], None]:
+        def inner():
+            if not cached:
+                bench.subscription_service.invalidate_cache()
+            start = time.perf_counter()
+            first = None
+            for _ in BatchStream(bench.subscription_service._iter_subscription_names, project_ids, 8, bench.logger):
+                first = first or time.perf_counter()
+            stream_first.append(((first or time.perf_counter()) - start) * 1000)
+
+        return inner
+
+    names = [name for project_id in project_ids for name in bench.fleet.subscription_names(project_id)]
+    for cached in [False, True]:
+        stream_first = []
+        total = _median(stream(cached))
+        label = "cached" if cached else "uncached"
+        _report(f"subscriptions of all projects, {label}, first", statistics.median(stream_first))
+        _report(f"subscriptions of all projects, {label}, all", total, f"{len(names)} names")
+    return names
+
+
+def picking(names: List[str]):
+    print("Picking")
+    index = TrigramIndex()
+    _report("index all names", _median(lambda: index.add(names), rounds=1), f"{len(names)} names")
+
+    keystrokes = []
+    for i in range(1, len(QUERY) + 1):
+        start = time.perf_counter()
+        index.search(QUERY[:i], LIMIT)
+        keystrokes.append((time.perf_counter() - start) * 1000)
+    _report("search per keystroke, median", statistics.median(keystrokes), f"'{QUERY}'")
+    _report("search per keystroke, max", max(keystrokes))
+
+
+def metrics(bench: Bench):
+    print("Metrics")
+    fleet = bench.fleet
+    project_id = fleet.project_ids()[0]
+    sub = fleet.subscription_names(project_id)[0]
+    topic = fleet.topic_names(project_id)[0]
+    subs = [SubscriptionParsed.from_subscription(name) for name in fleet.subscription_names(project_id)]
+    service = bench.metrics_service
+    now = datetime.utcnow()
+
+    def batch(cache: bool):
+        service.list_time_series_batch(subs, ["num_undelivered_messages"], now, points=60, cache=cache)
+
+    _report("series of a project's subscriptions, uncached", _median(lambda: batch(False)), f"{len(subs)} series")
+    batch(True)
+    _report("series of a project's subscriptions, cached", _median(lambda: batch(True)))
+    single = [SubscriptionParsed.from_subscription(sub)]
+    _report(
+        "series of a subscription",
+        _median(lambda: service.list_time_series_batch(single, ["sent_message_count"], now, points=60, cache=False)),
+    )
+    _report(
+        "series of a topic",
+        _median(lambda: service.list_topic_time_series(topic, ["send_request_count"], now, points=60)),
+    )
+    names = fleet.subscription_names(project_id)
+    _report("backlog of a project's subscriptions", _median(lambda: service.get_backlog_rollup(names, now, points=60)))
+    project_ids = fleet.project_ids()
+    _report(
+        "top subscriptions of all projects",
+        _median(lambda: service.top_subscriptions(project_ids, "num_undelivered_messages", 20, now)),
+        f"{len(project_ids)} projects",
+    )
+
+
+def _wait(futures: List[Future], name: str):
+    """
+    Wait until futures and callbacks of the view filling the frame are done, failing on a deadline or error
+    """
+    done = threading.Semaphore(0)  # of this frame only
+    for future in futures:
+        future.add_done_callback(lambda _: done.release())  # runs after the view's callbacks, added before
+    for _ in futures:
+        if not done.acquire(timeout=const.PUBSUB_META_METRICS_DEADLINE + 1):
+            raise RuntimeError(f"{name}: frame not complete within the metrics deadline")
+    for future in futures:
+        if future.exception():
+            raise RuntimeError(f"{name}: fetch failed") from future.exception()
+
+
+def render(bench: Bench):
+    print("Full-frame render")
+    fleet = bench.fleet
+    project_id = fleet.project_ids()[0]
+    window = Window(
+        bench.console,
+        bench.logger,
+        bench.config,
+        bench.topic_service,
+        bench.subscription_service,
+        bench.history_service,
+        bench.metrics_service,
+    )
+    window.topic = bench.topic_service.get_topic(fleet.topic_names(project_id)[0])
+    window.sub = bench.subscription_service.get_subscription(fleet.subscription_names(project_id)[0])
+    executors = [
+        RecordingExecutor(max_workers=const.PUBSUB_META_WORKERS, thread_name_prefix="metrics"),
+        RecordingExecutor(max_workers=len(RANKINGS), thread_name_prefix="backlog"),
+    ]
+    window.metrics_view.executor, window.backlog_view.executor = executors
+    live = Live(console=bench.console, auto_refresh=False)
+    now = datetime.utcnow()
+
+    for nav, tab in VIEWS:
+        name = f"{nav.name} {tab.name}"
+        frames, completes, renders = [], [], []
+        for _ in range(ROUNDS):
+            now += timedelta(minutes=1)  # refreshed as by --refresh 1m, nothing is reused
+            window.nav, window.tab, window.now = nav, tab, now
+            window.dirty = set(window.regions)
+            start = time.perf_counter()
+            window._update_panel(live)
+            bench.console.print(window.layout)
+            frames.append((time.perf_counter() - start) * 1000)
+            _wait([future for executor in executors for future in executor.drain()], name)
+            completes.append((time.perf_counter() - start) * 1000)
+            renders.append(_median(lambda: bench.console.print(window.layout)))
+            bench.console.file.seek(0)
+            bench.console.file.truncate()
+        _report(f"{name}, first frame", statistics.median(frames))
+        _report(f"{name}, complete frame", statistics.median(completes))
+        _report(f"{name}, redraw", statistics.median(renders))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=10)
+    parser.add_argument("--topics", type=int, default=50, help="per project")
+    parser.add_argument("--subscriptions", type=int, default=3, help="per topic")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds, of every call and page")
+    args = parser.parse_args()
+
+    fleet = Fleet(projects=args.projects, topics=args.topics, subscriptions=args.subscriptions)
+    bench = Bench(fleet, Latency(call=args.latency, page=args.latency))
+    print(f"{fleet}, latency {args.latency * 1000:.0f} ms, home {os.environ['PUBSUB_META_HOME']}\n")
+    names = listing(bench)
+    picking(names)
+    metrics(bench)
+    render(bench)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Cold start of the CLI: import-time breakdown of pubsub_meta.cli and wall-clock time of 'pubsub-meta --version'.
+Exits with 1 when the median wall-clock time is over the budget.
+
+    python -m benchmarks.startup_benchmark [budget in ms]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BUDGET_MS = float(os.getenv("PUBSUB_META_STARTUP_BUDGET", "400"))
+ROUNDS = 5
+TOP = 15
+
+
+def import_breakdown() -> list:
+    """
+    Slowest imports by cumulative time, as reported by 'python -X importtime'
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import pubsub_meta.cli"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        imports.append((int(cumulative) / 1000, name.rstrip()))
+    return sorted(imports, reverse=True)[:TOP]
+
+
+def wall_clock() -> float:
+    times = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "pubsub_meta", "--version"], capture_output=True, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else BUDGET_MS
+    print("Slowest imports (cumulative)")
+    for cumulative, name in import_breakdown():
+        print(f"{cumulative:10.1f} ms  {name}")
+    median = wall_clock()
+    print(f"\n'pubsub-meta --version' median of {ROUNDS}: {median:.1f} ms, budget {budget:.0f} ms")
+    if median > budget:
+        print("Over budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
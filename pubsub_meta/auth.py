@@ -49,6 +49,7 @@ class Auth:
             "https://www.googleapis.com/oauth2/v1/userinfo",
             headers={"Authorization": f"Bearer {flow.credentials.token}"},
         )
-        self.config.account = response.json()["email"]
-        self.config.credentials = flow.credentials.to_json()
+        with self.config.transaction():
+            self.config.account = response.json()["email"]
+            self.config.credentials = flow.credentials.to_json()
         self.console.print(Text("Credentials updated", style=const.info_style))
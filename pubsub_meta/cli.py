@@ -1,53 +1,71 @@
+import logging
+import math
 import os
+import sys
+from typing import List, Optional, Tuple
 
 import click
 from rich.console import Console
 
 from pubsub_meta import const, output
-from pubsub_meta.client import Client
 from pubsub_meta.config import Config
-from pubsub_meta.initialize import initialize
-from pubsub_meta.service.history_service import HistoryService
-from pubsub_meta.service.metrics_service import MetricsService
-from pubsub_meta.service.topic_service import TopicService
-from pubsub_meta.service.subscription_service import SubscriptionService
-from pubsub_meta.service.project_service import ProjectService
-from pubsub_meta.service.version_service import VersionService
-from pubsub_meta.window import Window
 from pubsub_meta.logger import Logger
+from pubsub_meta.util.export_utils import FORMATS, write_records
+from pubsub_meta.util.num_utils import parse_duration
 
+# Services, google clients and the window are imported by the code paths using them, keeping '--version',
+# '--info' and others fast. See benchmarks/startup_benchmark.py
 
-@click.command()
+
+def _duration(ctx: click.Context, param: click.Parameter, value: Optional[str]) -> Optional[float]:
+    """
+    Seconds of a duration option, e.g. 30s, 5m, 1h, usage error when unparsable or negative
+    """
+    if value is None:
+        return None
+    try:
+        seconds = parse_duration(value)
+    except ValueError:
+        raise click.BadParameter(f"'{value}' is not a duration, e.g. 30s, 5m or 1h")
+    if not math.isfinite(seconds) or seconds < 0:
+        raise click.BadParameter(f"'{value}' must be a finite, non-negative duration")
+    return seconds
+
+
+def _positive_duration(ctx: click.Context, param: click.Parameter, value: Optional[str]) -> Optional[float]:
+    seconds = _duration(ctx, param, value)
+    if seconds is not None and seconds < 1:
+        raise click.BadParameter(f"'{value}' must be at least 1s")
+    return seconds
+
+
+@click.group(invoke_without_command=True)
 @click.option("--init", help="Initialize 'pubsub-meta' configuration", is_flag=True)
 @click.option("--info", help="Print info of currently used account", is_flag=True)
 @click.option("--fetch-projects", help="Fetch available google projects", is_flag=True)
+@click.option(
+    "--refresh", help="Refresh window automatically in given interval, e.g. 15s, 1m, 0 is off", callback=_duration
+)
+@click.option("--offline", help="Show locally cached data only, without network requests", is_flag=True)
 @click.version_option()
 def cli(
     init: bool,
     info: bool,
     fetch_projects: bool,
+    refresh: Optional[float],
+    offline: bool,
 ):
     """Pub/Sub metadata"""
 
     ctx = click.get_current_context()
     console = Console(theme=const.theme, soft_wrap=True, force_interactive=True)
     config = Config()
-    logger = Logger("pubsub-meta")
-    client = Client(console, config)
-    project_service = ProjectService(console, config, client)
-    topic_service = TopicService(console, config, client, project_service)
-    subscription_service = SubscriptionService(console, config, client, project_service)
-    history_service = HistoryService(console, config, topic_service, subscription_service)
-    metrics_service = MetricsService(client, logger)
-    window = Window(console, logger, config, topic_service, subscription_service, history_service, metrics_service)
-    logger.info("Init")
-
-    if os.path.exists(const.PUBSUB_META_CONFIG):
-        version_service = VersionService()
-        version_service.update_config(config)
+    ctx.obj = config
 
     if init:
-        initialize(config, console, project_service)
+        from pubsub_meta.initialize import initialize
+
+        initialize(config, console, _project_service(console, config))
         ctx.exit()
     elif not os.path.exists(const.PUBSUB_META_HOME):
         console.print(output.get_init_output())
@@ -56,7 +74,227 @@ def cli(
         console.print(output.get_config_info(config))
         ctx.exit()
     elif fetch_projects:
-        project_service.fetch_projects()
+        _project_service(console, config).fetch_projects()
         ctx.exit()
+    elif ctx.invoked_subcommand:  # headless commands below
+        return
+
+    from pubsub_meta.client import Client
+    from pubsub_meta.service.cache_service import CacheService
+    from pubsub_meta.service.history_service import HistoryService
+    from pubsub_meta.service.inventory_service import InventoryService
+    from pubsub_meta.service.inventory_store import InventoryStore
+    from pubsub_meta.service.metrics_service import MetricsService
+    from pubsub_meta.service.project_service import ProjectService
+    from pubsub_meta.service.subscription_service import SubscriptionService
+    from pubsub_meta.service.topic_service import TopicService
+    from pubsub_meta.service.version_service import VersionService
+    from pubsub_meta.window import Window
+
+    logger = Logger("pubsub-meta")
+    client = Client(console, config)
+    project_service = ProjectService(console, config, client)
+    inventory_service = InventoryService(logger, client, InventoryStore())
+    cache_service = CacheService(logger, inventory_service.store)
+    topic_service = TopicService(
+        console, logger, config, client, project_service, cache_service, inventory_service, offline
+    )
+    subscription_service = SubscriptionService(
+        console, logger, config, client, project_service, cache_service, inventory_service, offline
+    )
+    history_service = HistoryService(console, config, topic_service, subscription_service)
+    metrics_service = MetricsService(client, logger)
+    refresh_interval = refresh or None  # 0 is off
+    window = Window(
+        console,
+        logger,
+        config,
+        topic_service,
+        subscription_service,
+        history_service,
+        metrics_service,
+        refresh_interval,
+        offline,
+    )
+    logger.info("Init")
+
+    if os.path.exists(const.PUBSUB_META_CONFIG):
+        version_service = VersionService(config, logger)
+        if offline:
+            version_service.update_current_version()
+        else:
+            version_service.update_config_async(window.on_version)
 
     window.live_window()
+
+
+def _project_service(console: Console, config: Config):
+    from pubsub_meta.client import Client
+    from pubsub_meta.service.project_service import ProjectService
+
+    return ProjectService(console, config, Client(console, config))
+
+
+# ======================   Headless   ======================
+
+FAILED_SHOWN = 5  # failed projects or names listed in the error
+
+project_option = click.option(
+    "--project", "-p", "project_ids", help="Project id, all fetched projects by default", multiple=True
+)
+format_option = click.option(
+    "--format", "-f", "fmt", help="Output format", type=click.Choice(FORMATS), default="jsonl", show_default=True
+)
+
+
+@cli.command("list")
+@click.argument("kind", type=click.Choice(["topics", "subscriptions"]))
+@project_option
+@format_option
+@click.pass_obj
+def list_command(config: Config, kind: str, project_ids: Tuple[str, ...], fmt: str):
+    """List topics or subscriptions of projects"""
+    from pubsub_meta.service import export_service
+
+    export, project_service = _export_service(config)
+    project_ids = project_ids or project_service.list_projects()
+    if kind == "topics":
+        _write(export.list_topics(project_ids), fmt, export_service.topic_fields())
+    else:
+        _write(export.list_subscriptions(project_ids), fmt, export_service.subscription_fields())
+
+
+@cli.command()
+@click.argument("names", nargs=-1)
+@format_option
+@click.pass_obj
+def describe(config: Config, names: Tuple[str, ...], fmt: str):
+    """Describe topics and subscriptions by full name, names are read from stdin when not given"""
+    from pubsub_meta.service import export_service
+
+    export, _ = _export_service(config)
+    names = names or (line.strip() for line in sys.stdin if line.strip())  # described while stdin is read
+    topic_fields = export_service.topic_fields()
+    fields = topic_fields + [field for field in export_service.subscription_fields() if field not in topic_fields]
+    _write(export.describe(names), fmt, fields)
+
+
+@cli.command()
+@click.argument("names", nargs=-1)
+@project_option
+@click.option("--metric", "-m", "metrics", help="Subscription metric, all known ones by default", multiple=True)
+@click.option(
+    "--window",
+    help="Time range, e.g. 1h",
+    default=f"{const.PUBSUB_META_METRICS_WINDOW}s",
+    show_default=True,
+    callback=_positive_duration,
+)
+@click.option(
+    "--period",
+    help="Alignment period of points, e.g. 1m",
+    default="1m",
+    show_default=True,
+    callback=_positive_duration,
+)
+@format_option
+@click.pass_obj
+def metrics(
+    config: Config,
+    names: Tuple[str, ...],
+    project_ids: Tuple[str, ...],
+    metrics: Tuple[str, ...],
+    window: float,
+    period: float,
+    fmt: str,
+):
+    """Points of subscription metrics, of given subscriptions or of all subscriptions in projects"""
+    from datetime import datetime
+
+    from pubsub_meta.service.export_service import METRIC_FIELDS
+    from pubsub_meta.service.metrics_service import METRIC_AGGREGATIONS
+
+    export, project_service = _export_service(config)
+    metric_names = list(metrics or METRIC_AGGREGATIONS)
+    args = (metric_names, datetime.utcnow(), int(window), int(period))
+    if names:
+        records = export.subscription_metrics(names, *args)
+    else:
+        records = export.project_metrics(project_ids or project_service.list_projects(), *args)
+    _write(records, fmt, METRIC_FIELDS)
+
+
+@cli.command()
+@project_option
+@click.option(
+    "--kind",
+    "-k",
+    "kinds",
+    help="Kind of entities, all by default",
+    type=click.Choice(["topics", "subscriptions", "snapshots", "schemas"]),
+    multiple=True,
+)
+@click.pass_obj
+def snapshot(config: Config, project_ids: Tuple[str, ...], kinds: Tuple[str, ...]):
+    """Store topics, subscriptions, snapshots and schemas of projects in the local inventory"""
+    from pubsub_meta.client import Client
+    from pubsub_meta.service.inventory_service import KINDS, InventoryService
+    from pubsub_meta.service.inventory_store import InventoryStore
+    from pubsub_meta.service.project_service import ProjectService
+
+    console = Console(theme=const.theme, stderr=True)
+    logger = Logger("pubsub-meta")
+    client = Client(console, config)
+    project_ids = project_ids or ProjectService(console, config, client).list_projects()
+    inventory_service = InventoryService(logger, client, InventoryStore())
+    with console.status("Snapshot", spinner="point"):
+        stats = inventory_service.snapshot(project_ids, kinds or KINDS)
+    for kind in kinds or KINDS:
+        counts = stats[kind]
+        console.print(
+            f"{kind}: {counts['upserted']} stored, {counts['deleted']} deleted, "
+            f"{counts['projects']}/{len(project_ids)} projects listed",
+            style=const.info_style if counts["projects"] == len(project_ids) else const.error_style,
+        )
+    if any(stats[kind]["projects"] < len(project_ids) for kind in kinds or KINDS):
+        click.get_current_context().exit(1)  # failed listings, stored entities were kept
+
+
+def _write(records, fmt: str, fields: List[str]):
+    """
+    Write records to stdout, exiting with 1 when any project or name failed, so scripts can tell it from no records
+    """
+    write_records(records, sys.stdout, fmt, fields)
+    if records.failed:
+        failed = ", ".join(str(item) for item in records.failed[:FAILED_SHOWN])
+        more = f" and {len(records.failed) - FAILED_SHOWN} more" if len(records.failed) > FAILED_SHOWN else ""
+        raise click.ClickException(f"Failed: {failed}{more}")
+
+
+def _export_service(config: Config):
+    from pubsub_meta.client import Client
+    from pubsub_meta.service.cache_service import CacheService
+    from pubsub_meta.service.export_service import ExportService
+    from pubsub_meta.service.inventory_service import InventoryService
+    from pubsub_meta.service.inventory_store import InventoryStore
+    from pubsub_meta.service.metrics_service import MetricsService
+    from pubsub_meta.service.project_service import ProjectService
+    from pubsub_meta.service.subscription_service import SubscriptionService
+    from pubsub_meta.service.topic_service import TopicService
+
+    console = Console(theme=const.theme, stderr=True)  # stdout is kept for records
+    logger = Logger("pubsub-meta")
+    errors = logging.StreamHandler(sys.stderr)
+    errors.setLevel(logging.ERROR)
+    logger.addHandler(errors)
+    client = Client(console, config)
+    project_service = ProjectService(console, config, client)
+    inventory_service = InventoryService(logger, client, InventoryStore())
+    cache_service = CacheService(logger, inventory_service.store)
+    topic_service = TopicService(console, logger, config, client, project_service, cache_service, inventory_service)
+    subscription_service = SubscriptionService(
+        console, logger, config, client, project_service, cache_service, inventory_service
+    )
+    metrics_service = MetricsService(client, logger)
+    export = ExportService(logger, topic_service, subscription_service, metrics_service)
+    return export, project_service
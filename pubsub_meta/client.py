@@ -1,46 +1,141 @@
-from google.cloud.pubsub_v1 import PublisherClient
-from google.cloud.pubsub_v1 import SubscriberClient
-from google.cloud.resourcemanager import ProjectsClient
-from google.oauth2.credentials import Credentials
-from google.cloud.monitoring_v3 import MetricServiceClient
+import atexit
+import json
+import threading
+from typing import TYPE_CHECKING, Dict
+
 from rich.console import Console
 
 from pubsub_meta.config import Config
 
+if TYPE_CHECKING:  # client libraries are imported on first use, each of them is slow to import
+    from google.cloud.monitoring_v3 import MetricServiceClient
+    from google.cloud.pubsub_v1 import PublisherClient, SubscriberClient
+    from google.cloud.resourcemanager import ProjectsClient
+    from google.oauth2.credentials import Credentials
+    from google.pubsub_v1 import SchemaServiceClient
+    from grpc import Channel
+
+CHANNEL_OPTIONS = [
+    ("grpc.keepalive_time_ms", 30_000),
+    ("grpc.keepalive_timeout_ms", 10_000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.max_send_message_length", -1),
+    ("grpc.max_receive_message_length", -1),
+]
+
 
 class Client:
+    """
+    Google API clients sharing one credentials instance, clients of the same API share one gRPC channel
+    """
+
     def __init__(self, console: Console, config: Config):
+        self._credentials = None
+        self._channels: Dict[str, "Channel"] = {}
         self._projects_client = None
         self._publisher_client = None
         self._subscriber_client = None
+        self._schema_client = None
         self._metrics_client = None
+        self._lock = threading.RLock()  # clients are shared by worker threads
         self.console = console
         self.config = config
 
+    def use(self, **clients):
+        """
+        Replace API clients, e.g. by fakes in benchmarks. Names are publisher, subscriber, schema, projects, metrics.
+        Replaced clients are never created, nor are credentials when all of the used ones are replaced.
+        """
+        with self._lock:
+            for name, client in clients.items():
+                attribute = f"_{name}_client"
+                if not hasattr(self, attribute):
+                    raise ValueError(f"Unknown client: {name}")
+                setattr(self, attribute, client)
+
     @property
-    def credentials(self) -> ProjectsClient:
-        return Credentials.from_authorized_user_info(self.config.credentials)
+    def credentials(self) -> "Credentials":
+        """
+        Credentials refreshed once for all clients, the access token is saved to config for the next run
+        """
+        with self._lock:
+            if not self._credentials:
+                from google.auth.transport.requests import Request
+                from google.oauth2.credentials import Credentials
+
+                credentials = Credentials.from_authorized_user_info(self.config.credentials)
+                if not credentials.valid:
+                    credentials.refresh(Request())
+                self._credentials = credentials
+                self._save_credentials()
+                atexit.register(self._save_credentials)  # token may be refreshed by clients meanwhile
+        return self._credentials
+
+    def _save_credentials(self):
+        credentials_json = self._credentials.to_json()
+        if json.loads(credentials_json).get("token") != self.config.credentials.get("token"):
+            self.config.credentials = credentials_json
+
+    def _channel(self, api: str, transport_cls) -> "Channel":
+        with self._lock:
+            if api not in self._channels:
+                self._channels[api] = transport_cls.create_channel(
+                    credentials=self.credentials,
+                    options=CHANNEL_OPTIONS,
+                )
+        return self._channels[api]
 
     @property
-    def publisher_client(self) -> PublisherClient:
-        if not self._publisher_client:
-            self._publisher_client = PublisherClient(credentials=self.credentials)
+    def publisher_client(self) -> "PublisherClient":
+        with self._lock:
+            if not self._publisher_client:
+                from google.cloud.pubsub_v1 import PublisherClient
+                from google.pubsub_v1.services.publisher.transports import PublisherGrpcTransport
+
+                channel = self._channel("pubsub", PublisherGrpcTransport)
+                self._publisher_client = PublisherClient(transport=PublisherGrpcTransport(channel=channel))
         return self._publisher_client
 
     @property
-    def subscriber_client(self) -> SubscriberClient:
-        if not self._subscriber_client:
-            self._subscriber_client = SubscriberClient(credentials=self.credentials)
+    def subscriber_client(self) -> "SubscriberClient":
+        with self._lock:
+            if not self._subscriber_client:
+                from google.cloud.pubsub_v1 import SubscriberClient
+                from google.pubsub_v1.services.subscriber.transports import SubscriberGrpcTransport
+
+                channel = self._channel("pubsub", SubscriberGrpcTransport)
+                self._subscriber_client = SubscriberClient(transport=SubscriberGrpcTransport(channel=channel))
         return self._subscriber_client
 
     @property
-    def projects_client(self) -> ProjectsClient:
-        if not self._projects_client:
-            self._projects_client = ProjectsClient(credentials=self.credentials)
+    def schema_client(self) -> "SchemaServiceClient":
+        with self._lock:
+            if not self._schema_client:
+                from google.pubsub_v1 import SchemaServiceClient
+                from google.pubsub_v1.services.schema_service.transports import SchemaServiceGrpcTransport
+
+                channel = self._channel("pubsub", SchemaServiceGrpcTransport)
+                self._schema_client = SchemaServiceClient(transport=SchemaServiceGrpcTransport(channel=channel))
+        return self._schema_client
+
+    @property
+    def projects_client(self) -> "ProjectsClient":
+        with self._lock:
+            if not self._projects_client:
+                from google.cloud.resourcemanager import ProjectsClient
+                from google.cloud.resourcemanager_v3.services.projects.transports import ProjectsGrpcTransport
+
+                channel = self._channel("resourcemanager", ProjectsGrpcTransport)
+                self._projects_client = ProjectsClient(transport=ProjectsGrpcTransport(channel=channel))
         return self._projects_client
 
     @property
-    def metrics_client(self) -> MetricServiceClient:
-        if not self._metrics_client:
-            self._metrics_client = MetricServiceClient(credentials=self.credentials)
+    def metrics_client(self) -> "MetricServiceClient":
+        with self._lock:
+            if not self._metrics_client:
+                from google.cloud.monitoring_v3 import MetricServiceClient
+                from google.cloud.monitoring_v3.services.metric_service.transports import MetricServiceGrpcTransport
+
+                channel = self._channel("monitoring", MetricServiceGrpcTransport)
+                self._metrics_client = MetricServiceClient(transport=MetricServiceGrpcTransport(channel=channel))
         return self._metrics_client
@@ -1,9 +1,13 @@
 import json
-from typing import List
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
 
 import yaml
 
 from pubsub_meta import const
+from pubsub_meta.util import file_utils
 
 
 class Config:
@@ -24,28 +28,72 @@ class Config:
         "credentials": None,
         "current_version": None,
         "available_version": None,
+        "version_checked_at": None,
         "account": "",
     }
 
     def __init__(self) -> None:
         self.config_path = const.PUBSUB_META_CONFIG
         self._conf = None
+        self._mtime = None  # of the file when it was last read or written
+        self._credentials = None  # parsed credentials of _conf
+        self._transactions = 0
+        self._pending = False  # changes not yet written, inside of a transaction
+        self._lock = threading.RLock()
 
     def write_default(self):
         conf = Config.default
         self._save_conf(conf)
 
+    @contextmanager
+    def transaction(self) -> Iterator["Config"]:
+        """
+        Changes made inside are written to the file once, at the end of the outermost transaction
+        """
+        with self._lock:
+            self._transactions += 1
+            try:
+                yield self
+            finally:
+                self._transactions -= 1
+                if not self._transactions and self._pending:
+                    self._write()
+
     def _save_conf(self, conf: dict):
-        self._conf = conf
-        with open(self.config_path, "w") as f:
-            yaml.safe_dump(conf, f)
+        with self._lock:
+            self._conf = conf
+            self._credentials = None
+            if self._transactions:
+                self._pending = True
+            else:
+                self._write()
+
+    def _write(self):
+        file_utils.atomic_write(self.config_path, yaml.safe_dump(self._conf))
+        self._mtime = self._file_mtime()
+        self._pending = False
+
+    def _file_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.config_path).st_mtime_ns
+        except OSError:
+            return None
 
     @property
     def conf(self) -> dict:
-        if not self._conf:
-            with open(self.config_path, "r") as f:
-                self._conf = yaml.safe_load(f)
-        return self._conf
+        """
+        Parsed config, read again only when the file was changed since
+        """
+        with self._lock:
+            if self._pending:
+                return self._conf
+            mtime = self._file_mtime()
+            if not self._conf or mtime != self._mtime:
+                with open(self.config_path, "r") as f:
+                    self._conf = yaml.safe_load(f)
+                self._mtime = mtime
+                self._credentials = None
+            return self._conf
 
     @property
     def client_config(self) -> dict:
@@ -66,7 +114,11 @@ class Config:
 
     @property
     def credentials(self) -> dict:
-        return json.loads(self.conf["credentials"])
+        with self._lock:
+            conf = self.conf
+            if self._credentials is None:
+                self._credentials = json.loads(conf["credentials"])
+            return self._credentials
 
     @credentials.setter
     def credentials(self, credentials: dict):
@@ -90,3 +142,12 @@ class Config:
     def available_version(self, available_version: str):
         conf = {**self.conf, "available_version": available_version}
         self._save_conf(conf)
+
+    @property
+    def version_checked_at(self) -> Optional[float]:
+        return self.conf.get("version_checked_at", None)
+
+    @version_checked_at.setter
+    def version_checked_at(self, version_checked_at: float):
+        conf = {**self.conf, "version_checked_at": version_checked_at}
+        self._save_conf(conf)
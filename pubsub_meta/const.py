@@ -1,6 +1,5 @@
 from pathlib import Path
 import os
-import yaml
 from rich.style import Style
 from rich.theme import Theme
 from rich.box import Box
@@ -14,6 +13,17 @@ PUBSUB_META_PROJECTS = f"{PUBSUB_META_HOME}/projects"
 PUBSUB_META_HISTORY = f"{PUBSUB_META_HOME}/history"
 PUBSUB_META_TOPIC_HISTORY = f"{PUBSUB_META_HISTORY}/topic"
 PUBSUB_META_SUBSCRIPTION_HISTORY = f"{PUBSUB_META_HISTORY}/subscription"
+PUBSUB_META_CACHE = f"{PUBSUB_META_HOME}/cache"
+PUBSUB_META_INVENTORY = f"{PUBSUB_META_HOME}/inventory.db"
+
+PUBSUB_META_CACHE_TTL = int(os.getenv("PUBSUB_META_CACHE_TTL", "3600"))  # seconds
+PUBSUB_META_HISTORY_SIZE = int(os.getenv("PUBSUB_META_HISTORY_SIZE", "100"))  # entries
+PUBSUB_META_VERSION_CHECK_TTL = int(os.getenv("PUBSUB_META_VERSION_CHECK_TTL", "86400"))  # seconds
+PUBSUB_META_WORKERS = int(os.getenv("PUBSUB_META_WORKERS", "16"))  # concurrent requests
+PUBSUB_META_METRICS_WINDOW = int(os.getenv("PUBSUB_META_METRICS_WINDOW", "3600"))  # seconds, graphs time range
+PUBSUB_META_METRICS_DEADLINE = float(os.getenv("PUBSUB_META_METRICS_DEADLINE", "10"))  # seconds, per metrics view
+
+PUBSUB_META_PICKER = os.getenv("PUBSUB_META_PICKER", "builtin")  # builtin | fzf
 
 PUBSUB_META_DISABLE_COLORS = os.getenv("PUBSUB_META_DISABLE_COLORS", "False").lower() in ("true", "1", "t")
 PUBSUB_META_SKIN = os.getenv("PUBSUB_META_SKIN")
@@ -33,6 +43,8 @@ default_skin = {
 skin = default_skin
 
 if PUBSUB_META_SKIN and os.path.isfile(PUBSUB_META_SKIN):
+    import yaml
+
     PUBSUB_META_skin = yaml.safe_load(open(PUBSUB_META_SKIN, "r"))
     skin = {**skin, **PUBSUB_META_skin}
 
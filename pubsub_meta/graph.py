@@ -1,35 +1,76 @@
-from datetime import datetime
-from typing import List
-import plotext
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Tuple
+
 from rich.ansi import AnsiDecoder
 from rich.console import Console, ConsoleOptions, Group, RenderResult
 from rich.jupyter import JupyterMixin
+from rich.text import Text
+
+from pubsub_meta.types import TimeSeries
+from pubsub_meta.util.series_utils import lttb
+
+X_TICKS = 4
+CANVAS_CACHE_SIZE = 32
+
+CanvasKey = Tuple[int, int, int, str]  # series version, width, height, title
+
+_canvas_cache: "OrderedDict[CanvasKey, List[Text]]" = OrderedDict()
+_canvas_lock = threading.Lock()
 
 
 class Graph(JupyterMixin):
     def __init__(
         self,
-        dates: List[datetime],
-        points: List[int],
+        series: TimeSeries,
         title: str = None,
     ):
         self.decoder = AnsiDecoder()
         self.title = title
-        self.dates = dates
-        self.points = points
+        self.series = series
 
     def __rich_console__(self, console: Console, options: ConsoleOptions) -> RenderResult:
         width = options.max_width or console.width
         height = options.height or console.height
+        key = (self.series.version, width, height, self.title)
+        with _canvas_lock:
+            lines = _canvas_cache.get(key)
+            if lines is None:
+                lines = list(self.decoder.decode(self._build(width, height)))
+                _canvas_cache[key] = lines
+                if len(_canvas_cache) > CANVAS_CACHE_SIZE:
+                    _canvas_cache.popitem(last=False)
+            else:
+                _canvas_cache.move_to_end(key)
+        self.rich_canvas = Group(*lines)
+        yield self.rich_canvas
+
+    def _build(self, width: int, height: int) -> str:
+        import plotext  # slow to import, needed only once a graph is rendered
+
+        series = lttb(self.series, width)  # no more points than columns of the canvas
         plotext.clear_figure()
-        plotext.date_form("H:M:S")
         plotext.plot_size(width, height)
         plotext.canvas_color("default")
         plotext.axes_color("default")
         plotext.ticks_color("default")
         plotext.title(self.title)
-        dates_str = plotext.datetimes_to_string(self.dates)
-        plotext.plot(dates_str, self.points)
-        canvas = plotext.build()
-        self.rich_canvas = Group(*self.decoder.decode(canvas))
-        yield self.rich_canvas
+        if len(series):
+            timestamps = series.timestamps.tolist()
+            plotext.plot(timestamps, series.values.tolist())
+            ticks = _ticks(timestamps[0], timestamps[-1])
+            plotext.xticks(ticks, [time.strftime("%H:%M:%S", time.gmtime(tick)) for tick in ticks])
+        return plotext.build()
+
+
+def clear_canvas_cache():
+    with _canvas_lock:
+        _canvas_cache.clear()
+
+
+def _ticks(start: float, end: float) -> list:
+    if end <= start:
+        return [start]
+    step = (end - start) / (X_TICKS - 1)
+    return [start + i * step for i in range(X_TICKS)]
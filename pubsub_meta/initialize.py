@@ -33,6 +33,8 @@ def initialize(config: Config, console: Console, project_service: ProjectService
     _print_created(console, const.PUBSUB_META_TOPIC_HISTORY)
     Path(const.PUBSUB_META_SUBSCRIPTION_HISTORY).touch()
     _print_created(console, const.PUBSUB_META_SUBSCRIPTION_HISTORY)
+    Path(const.PUBSUB_META_CACHE).mkdir(parents=True, exist_ok=True)
+    _print_created(console, const.PUBSUB_META_CACHE)
 
     Prompt.ask(
         Text("", style=const.darker_style).append("Login to google account", style=const.request_style),
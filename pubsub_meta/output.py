@@ -1,7 +1,5 @@
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional
 
-from google.pubsub_v1.types.pubsub import Subscription, Topic
-from packaging import version
 from rich.align import Align
 from rich.columns import Columns
 from rich.console import Group, NewLine, RenderableType
@@ -12,7 +10,11 @@ from rich.text import Text
 
 from pubsub_meta import const
 from pubsub_meta.config import Config
-from pubsub_meta.window import Nav, Tab
+
+if TYPE_CHECKING:  # imported by the window only, keeping the CLI startup light
+    from google.pubsub_v1.types.pubsub import Subscription, Topic
+    from pubsub_meta.types import AttachedSubscription
+    from pubsub_meta.window import Nav, Tab
 
 title = """
 █▀▄ █ █ ██▄ ▄▀▀ █ █ ██▄   █▄ ▄█ ██▀ ▀█▀ ▄▀▄ █▀▄ ▄▀▄ ▀█▀ ▄▀▄
@@ -31,6 +33,8 @@ def header_layout(config: Config) -> Layout:
 
 
 def version_layout(config: Config) -> Layout:
+    from packaging import version
+
     if config.current_version and config.available_version:
         current = version.parse(config.current_version)
         available = version.parse(config.available_version)
@@ -43,7 +47,7 @@ def version_layout(config: Config) -> Layout:
     return Layout(version_text, size=20)
 
 
-def nav_layout(navs: List[Nav], selected: Nav) -> Layout:
+def nav_layout(navs: List["Nav"], selected: "Nav") -> Layout:
     separator = Rule(style=const.darker_style)
     nav_list: list[RenderableType] = []
     for nav in navs:
@@ -56,7 +60,7 @@ def nav_layout(navs: List[Nav], selected: Nav) -> Layout:
     return Layout(panel, name="nav", size=20)
 
 
-def tabs_layout(tabs: List[Tab], selected: Tab) -> Layout:
+def tabs_layout(tabs: List["Tab"], selected: "Tab") -> Layout:
     separator = Text("|", style=const.darker_style)
     tab_list = []
     for tab in tabs:
@@ -77,6 +81,14 @@ def content_layout(renderable: Optional[RenderableType]) -> Layout:
     return Layout(content, name="content")
 
 
+def placeholder(title: str, status: str) -> Align:
+    """
+    Title and status, e.g. loading, centered in place of content not available yet
+    """
+    text = Text(title, style="default").append(f"\n{status}", style=const.darker_style)
+    return Align(text, align="center", vertical="middle")
+
+
 def get_init_output() -> Panel:
     return Panel(
         title="Not initialized, run",
@@ -91,7 +103,7 @@ def get_config_info(config: Config) -> Group:
     return Group(text_tuple("Account", config.account))
 
 
-def get_subscription_output(sub: Subscription) -> Group:
+def get_subscription_output(sub: "Subscription") -> Group:
     return Group(
         text_tuple("Name", sub.name),
         text_tuple("Topic", sub.topic),
@@ -116,14 +128,34 @@ def get_subscription_output(sub: Subscription) -> Group:
     )
 
 
-def get_topic_output(topic: Topic) -> Group:
+def get_topic_output(topic: "Topic", attached: Optional[List["AttachedSubscription"]] = None) -> Group:
     return Group(
         text_tuple("Topic name", topic.name),
         text_tuple("Labels", topic.labels),
         text_tuple("Schema settings", topic.schema_settings),
+        Rule(style=const.darker_style),
+        attached_subscriptions_output(topic, attached),
     )
 
 
+def attached_subscriptions_output(topic: "Topic", attached: Optional[List["AttachedSubscription"]]) -> Group:
+    if attached is None:
+        hint = Text("not indexed, run 'pubsub-meta snapshot'", style=const.darker_style)
+        return Group(text_tuple("Subscriptions", hint))
+    project_id = topic.name.split("/")[1]
+    lines = []
+    for sub in attached:
+        text = Text(sub.name, style="default")
+        if sub.dead_letter_topic == topic.name and sub.topic != topic.name:
+            text.append(f" dead letters from {sub.topic}", style=const.time_style)
+        elif sub.dead_letter_topic:
+            text.append(f" dead letters to {sub.dead_letter_topic}", style=const.darker_style)
+        if sub.project_id != project_id:
+            text.append(" cross-project", style=const.info_style)
+        lines.append(text)
+    return Group(text_tuple("Subscriptions", len(attached)), *lines)
+
+
 def text_tuple(name: str, value) -> Text:
     text = None
     if isinstance(value, Text):
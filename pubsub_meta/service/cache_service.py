@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from pubsub_meta import const
+from pubsub_meta.logger import Logger
+from pubsub_meta.service.inventory_store import InventoryStore
+from pubsub_meta.util import file_utils
+
+TOPICS = "topics"
+SUBSCRIPTIONS = "subscriptions"
+
+
+class CacheService:
+    """
+    On-disk cache of topic and subscription names, one file per (kind, project).
+    Projects without a cache file are read from the inventory, when it was snapshot.
+    """
+
+    def __init__(self, logger: Logger, inventory: Optional[InventoryStore] = None) -> None:
+        self.logger = logger
+        self.inventory = inventory
+        self.cache_path = const.PUBSUB_META_CACHE
+        self.ttl = const.PUBSUB_META_CACHE_TTL
+        self._invalidated_at: Dict[str, float] = {}  # inventory listings before are ignored as well
+        self._revalidating: Set[Tuple[str, str]] = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=const.PUBSUB_META_WORKERS, thread_name_prefix="cache")
+
+    def _path(self, kind: str, project_id: str) -> str:
+        return f"{self.cache_path}/{kind}/{project_id}"
+
+    # ====================   Read   ======================
+
+    def get(self, kind: str, project_id: str) -> Optional[List[str]]:
+        path = self._path(kind, project_id)
+        if os.path.isfile(path):
+            with open(path, "r") as f:
+                return f.read().splitlines()
+        if self._inventory_listed_at(kind, project_id) is not None:
+            return self.inventory.names(kind, project_id)
+        return None
+
+    def is_fresh(self, kind: str, project_id: str) -> bool:
+        try:
+            mtime = os.path.getmtime(self._path(kind, project_id))
+        except OSError:
+            mtime = self._inventory_listed_at(kind, project_id)
+        return mtime is not None and time.time() - mtime < self.ttl
+
+    def lookup(self, kind: str, project_id: str, fetch: Callable[[], List[str]]) -> Optional[List[str]]:
+        """
+        Cached names, stale ones are returned as well and revalidated in the background using fetch
+        """
+        names = self.get(kind, project_id)
+        if names is not None and not self.is_fresh(kind, project_id):
+            self.revalidate(kind, project_id, fetch)
+        return names
+
+    def _inventory_listed_at(self, kind: str, project_id: str) -> Optional[float]:
+        listed_at = self.inventory.listed_at(kind, project_id) if self.inventory else None
+        if listed_at is None or listed_at < self._invalidated_at.get(kind, 0):
+            return None
+        return listed_at
+
+    # ====================   Write   ======================
+
+    def save(self, kind: str, project_id: str, names: List[str]):
+        file_utils.atomic_write(self._path(kind, project_id), "\n".join(names))
+
+    def invalidate(self, kind: str):
+        for path in Path(f"{self.cache_path}/{kind}").glob("*"):
+            path.unlink(missing_ok=True)
+        self._invalidated_at[kind] = time.time()
+        self.logger.info(f"Cache invalidated: {kind}")
+
+    def revalidate(self, kind: str, project_id: str, fetch: Callable[[], List[str]]):
+        key = (kind, project_id)
+        with self._lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+        self._executor.submit(self._revalidate, key, fetch)
+
+    def _revalidate(self, key: Tuple[str, str], fetch: Callable[[], List[str]]):
+        kind, project_id = key
+        try:
+            self.save(kind, project_id, fetch())
+            self.logger.info(f"Cache revalidated: {kind}, {project_id}")
+        except Exception as e:
+            self.logger.error(f"Cache revalidation failed: {kind}, {project_id}: {e}")
+        finally:
+            with self._lock:
+                self._revalidating.discard(key)
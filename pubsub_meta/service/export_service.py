@@ -0,0 +1,140 @@
+from dataclasses import replace
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional
+
+from google.pubsub_v1.types.pubsub import Subscription, Topic
+from pubsub_meta import const
+from pubsub_meta.logger import Logger
+from pubsub_meta.service.metrics_service import METRIC_AGGREGATIONS, SUBSCRIPTIONS_PER_REQUEST, MetricsService
+from pubsub_meta.service.subscription_service import SubscriptionService
+from pubsub_meta.service.topic_service import TopicService
+from pubsub_meta.types import MetricAggregation, SubscriptionParsed
+from pubsub_meta.util.concurrent_utils import BatchStream
+from pubsub_meta.util.export_utils import Record
+
+METRIC_FIELDS = ["subscription", "metric", "timestamp", "value"]
+
+
+def topic_fields() -> List[str]:
+    return [field.name for field in Topic.pb().DESCRIPTOR.fields]
+
+
+def subscription_fields() -> List[str]:
+    return [field.name for field in Subscription.pb().DESCRIPTOR.fields]
+
+
+def _subscription(name: str) -> Optional[SubscriptionParsed]:
+    parts = name.strip().split("/")
+    if len(parts) != 4 or parts[0] != "projects" or parts[2] != "subscriptions" or not all(parts):
+        return None
+    return SubscriptionParsed(project_id=parts[1], subscription_id=parts[3])
+
+
+class ExportService:
+    """
+    Streams of records for scripting, batches are produced concurrently across projects.
+    Streams are bounded, workers wait while the output is being written.
+    """
+
+    def __init__(
+        self,
+        logger: Logger,
+        topic_service: TopicService,
+        subscription_service: SubscriptionService,
+        metrics_service: MetricsService,
+    ) -> None:
+        self.logger = logger
+        self.topic_service = topic_service
+        self.subscription_service = subscription_service
+        self.metrics_service = metrics_service
+
+    def list_topics(self, project_ids: Iterable[str]) -> BatchStream:
+        def records(project_id: str) -> Iterator[List[Record]]:
+            for page in self.topic_service.iter_topics(project_id):
+                yield [Topic.to_dict(topic) for topic in page]
+
+        return self._stream(records, project_ids)
+
+    def list_subscriptions(self, project_ids: Iterable[str]) -> BatchStream:
+        def records(project_id: str) -> Iterator[List[Record]]:
+            for page in self.subscription_service.iter_subscriptions(project_id):
+                yield [Subscription.to_dict(sub) for sub in page]
+
+        return self._stream(records, project_ids)
+
+    def describe(self, names: Iterable[str]) -> BatchStream:
+        """
+        Topics and subscriptions by full name, e.g. projects/<project>/topics/<topic>
+        """
+
+        def records(name: str) -> Iterator[List[Record]]:
+            if "/subscriptions/" in name:
+                yield [Subscription.to_dict(self.subscription_service.get_subscription(name))]
+            elif "/topics/" in name:
+                yield [Topic.to_dict(self.topic_service.get_topic(name))]
+            else:
+                raise ValueError(f"Not a topic or subscription name: {name}")
+
+        return self._stream(records, names)
+
+    def project_metrics(
+        self, project_ids: Iterable[str], metrics: List[str], now: datetime, window: int, period: int
+    ) -> BatchStream:
+        """
+        Points of all subscriptions in projects, fetched page by page of the subscription listing
+        """
+
+        def records(project_id: str) -> Iterator[List[Record]]:
+            for page in self.subscription_service.iter_subscriptions(project_id):
+                subs = [SubscriptionParsed.from_subscription(sub.name) for sub in page]
+                for i in range(0, len(subs), SUBSCRIPTIONS_PER_REQUEST):
+                    chunk = subs[i : i + SUBSCRIPTIONS_PER_REQUEST]
+                    yield from self._metric_records(chunk, metrics, now, window, period)
+
+        return self._stream(records, project_ids)
+
+    def subscription_metrics(
+        self, names: Iterable[str], metrics: List[str], now: datetime, window: int, period: int
+    ) -> BatchStream:
+        """
+        Points of subscriptions by full name. Malformed names fail on their own, the other ones are exported.
+        """
+        subs, malformed = set(), []
+        for name in names:
+            sub = _subscription(name)
+            if sub:
+                subs.add(sub)
+            else:
+                malformed.append(name)
+        subs = sorted(subs, key=lambda sub: sub.project_id)
+        chunks = [subs[i : i + SUBSCRIPTIONS_PER_REQUEST] for i in range(0, len(subs), SUBSCRIPTIONS_PER_REQUEST)]
+
+        def records(item) -> Iterator[List[Record]]:
+            if isinstance(item, str):
+                raise ValueError(f"Not a subscription name: {item}")
+            return self._metric_records(item, metrics, now, window, period)
+
+        return self._stream(records, chunks + malformed)  # malformed names are reported as failed items
+
+    def _metric_records(
+        self, subs: List[SubscriptionParsed], metrics: List[str], now: datetime, window: int, period: int
+    ) -> Iterator[List[Record]]:
+        for metric in metrics:
+            aggregation = replace(METRIC_AGGREGATIONS.get(metric, MetricAggregation()), alignment_period=period)
+            series = self.metrics_service.list_time_series_batch(
+                subs, [metric], now, aggregation=aggregation, window=window, cache=False
+            )
+            yield [
+                {
+                    "subscription": f"projects/{sub.project_id}/subscriptions/{sub.subscription_id}",
+                    "metric": metric,
+                    "timestamp": datetime.utcfromtimestamp(timestamp).isoformat() + "Z",
+                    "value": value,
+                }
+                for (sub, _), sub_series in series.items()
+                for timestamp, value in zip(sub_series.timestamps, sub_series.values)
+            ]
+
+    def _stream(self, fn, items: Iterable) -> BatchStream:
+        workers = const.PUBSUB_META_WORKERS
+        return BatchStream(fn, items, workers, self.logger, max_pending=workers)
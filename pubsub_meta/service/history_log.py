@@ -0,0 +1,81 @@
+import base64
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+from pubsub_meta.util import file_utils
+
+SEPARATOR = "\t"
+
+
+class HistoryLog:
+    """
+    Append-only log of most recently used names, each line is a name and optionally base64 serialized entity.
+    Later lines override earlier ones, the log is compacted to the last `size` names once it doubles.
+    """
+
+    def __init__(self, path: str, size: int) -> None:
+        self.path = path
+        self.size = size
+        self._index: Optional["OrderedDict[str, Optional[bytes]]"] = None  # name -> snapshot, oldest first
+        self._lines = 0
+        self._newline_missing = False  # history written by older versions doesn't end with a newline
+        self._lock = threading.Lock()
+
+    @property
+    def index(self) -> "OrderedDict[str, Optional[bytes]]":
+        if self._index is None:
+            self._index = OrderedDict()
+            if os.path.isfile(self.path):
+                with open(self.path, "r") as f:
+                    content = f.read()
+                self._newline_missing = bool(content) and not content.endswith("\n")
+                for line in content.splitlines():
+                    name, _, snapshot = line.partition(SEPARATOR)
+                    if name:
+                        self._index.pop(name, None)
+                        self._index[name] = base64.b64decode(snapshot) if snapshot else None
+                        self._lines += 1
+        return self._index
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return list(self.index)
+
+    def last(self) -> Optional[str]:
+        with self._lock:
+            return next(reversed(self.index), None)
+
+    def snapshot(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            return self.index.get(name)
+
+    def append(self, name: str, snapshot: Optional[bytes]):
+        with self._lock:
+            index = self.index
+            if index.get(name, b"") == snapshot and next(reversed(index), None) == name:
+                return  # already the most recent, unchanged
+            index.pop(name, None)
+            index[name] = snapshot
+            if self._lines + 1 > 2 * self.size:
+                self._compact()
+            else:
+                encoded = base64.b64encode(snapshot).decode("ascii") if snapshot else ""
+                with open(self.path, "a") as f:
+                    if self._newline_missing:
+                        f.write("\n")
+                        self._newline_missing = False
+                    f.write(f"{name}{SEPARATOR}{encoded}\n")
+                self._lines += 1
+
+    def _compact(self):
+        while len(self._index) > self.size:
+            self._index.popitem(last=False)
+        lines = []
+        for name, snapshot in self._index.items():
+            encoded = base64.b64encode(snapshot).decode("ascii") if snapshot else ""
+            lines.append(f"{name}{SEPARATOR}{encoded}\n")
+        file_utils.atomic_write(self.path, "".join(lines))
+        self._lines = len(lines)
+        self._newline_missing = False
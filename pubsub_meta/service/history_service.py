@@ -2,6 +2,7 @@ from typing import List, Optional
 
 from pubsub_meta import const
 from pubsub_meta.config import Config
+from pubsub_meta.service.history_log import HistoryLog
 from pubsub_meta.service.topic_service import TopicService
 from pubsub_meta.service.subscription_service import SubscriptionService
 from pubsub_meta.util import bash_util
@@ -22,66 +23,69 @@ class HistoryService:
         self.config = config
         self.topic_service = topic_service
         self.subscription_service = subscription_service
-        self.topic_path = const.PUBSUB_META_TOPIC_HISTORY
-        self.subscription_path = const.PUBSUB_META_SUBSCRIPTION_HISTORY
-    
+        self.topic_log = HistoryLog(const.PUBSUB_META_TOPIC_HISTORY, const.PUBSUB_META_HISTORY_SIZE)
+        self.subscription_log = HistoryLog(const.PUBSUB_META_SUBSCRIPTION_HISTORY, const.PUBSUB_META_HISTORY_SIZE)
+
     # ====================   List   ======================
 
     def list_topics(self) -> List[str]:
-        topics = open(self.topic_path, "r").read().splitlines()
-        return topics
+        return self.topic_log.names()
 
     def list_subscriptions(self) -> List[str]:
-        subs = open(self.subscription_path, "r").read().splitlines()
-        return subs
+        return self.subscription_log.names()
 
     # ====================   Last   ======================
-    
+
     def last_topic(self) -> Optional[Topic]:
-        topics = self.list_topics()
-        topic_name = topics[-1]
+        topic_name = self.topic_log.last()
+        if not topic_name:
+            return None
         topic = self.topic_service.get_topic(topic_name)
         return topic
-    
+
     def last_subscription(self) -> Optional[Subscription]:
-        subs = self.list_subscriptions()
-        sub_name = subs[-1]
+        sub_name = self.subscription_log.last()
+        if not sub_name:
+            return None
         subscription = self.subscription_service.get_subscription(sub_name)
         return subscription
 
-    
+    # ====================   Cached   ======================
+
+    def cached_topic(self, topic_name: Optional[str] = None) -> Optional[Topic]:
+        """
+        Topic as it was saved in history, the last one by default, without any request
+        """
+        snapshot = self.topic_log.snapshot(topic_name or self.topic_log.last())
+        return Topic.deserialize(snapshot) if snapshot else None
+
+    def cached_subscription(self, sub_name: Optional[str] = None) -> Optional[Subscription]:
+        """
+        Subscription as it was saved in history, the last one by default, without any request
+        """
+        snapshot = self.subscription_log.snapshot(sub_name or self.subscription_log.last())
+        return Subscription.deserialize(snapshot) if snapshot else None
+
     # ====================   Save   ======================
 
     def save_topic(self, topic: Topic):
-        topics = self.list_topics()
-        try:
-            topics.remove(topic.name)
-        except ValueError:
-            pass
-        topics.append(topic.name)
-        with open(self.topic_path, "w") as f:
-            f.write("\n".join(topics))
+        self.topic_log.append(topic.name, Topic.serialize(topic))
 
     def save_subscription(self, sub: Subscription):
-        subs = self.list_subscriptions()
-        try:
-            subs.remove(sub.name)
-        except ValueError:
-            pass
-        subs.append(sub.name)
-        with open(self.subscription_path, "w") as f:
-            f.write("\n".join(subs))
-            
+        self.subscription_log.append(sub.name, Subscription.serialize(sub))
+
     # ====================   Pick   ======================
 
     def pick_topic(self, live: Live) -> Optional[Topic]:
         topics = self.list_topics()
         topic_name = bash_util.pick_one(topics, live)
-        topic = self.topic_service.get_topic(topic_name)
-        return topic
+        if not topic_name:
+            return None
+        return self.cached_topic(topic_name) or self.topic_service.get_topic(topic_name)
 
     def pick_subscription(self, live: Live) -> Optional[Subscription]:
         subs = self.list_subscriptions()
         sub_name = bash_util.pick_one(subs, live)
-        subscription = self.subscription_service.get_subscription(sub_name)
-        return subscription
+        if not sub_name:
+            return None
+        return self.cached_subscription(sub_name) or self.subscription_service.get_subscription(sub_name)
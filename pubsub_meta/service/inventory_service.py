@@ -0,0 +1,117 @@
+import sqlite3
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from google.pubsub_v1.types import Schema, Snapshot, Subscription, Topic
+from pubsub_meta import const
+from pubsub_meta.client import Client
+from pubsub_meta.logger import Logger
+from pubsub_meta.service.cache_service import SUBSCRIPTIONS, TOPICS
+from pubsub_meta.service.inventory_store import InventoryStore, Row
+from pubsub_meta.types import AttachedSubscription
+from pubsub_meta.util.concurrent_utils import BatchStream
+
+SNAPSHOTS = "snapshots"
+SCHEMAS = "schemas"
+KINDS = {TOPICS: Topic, SUBSCRIPTIONS: Subscription, SNAPSHOTS: Snapshot, SCHEMAS: Schema}
+
+
+@dataclass
+class _Page:
+    kind: str
+    project_id: str
+    entities: list = field(default_factory=list)
+    complete: bool = False  # last page of a listing which did not fail
+
+
+class InventoryService:
+    """
+    Snapshots of all entities in projects, listed concurrently into the local inventory store.
+    Listings and gets done by other services are saved as well, keeping the inventory up to date in between.
+    """
+
+    def __init__(self, logger: Logger, client: Client, store: InventoryStore) -> None:
+        self.logger = logger
+        self.client = client
+        self.store = store
+
+    def get(self, kind: str, name: str):
+        data = self.store.get(name)
+        return KINDS[kind].deserialize(data) if data is not None else None
+
+    def attached_subscriptions(self, topic_name: str) -> Optional[List[AttachedSubscription]]:
+        """
+        Subscriptions of topic and the ones dead lettering into it, None when no subscriptions were listed yet
+        """
+        if not self.store.listings(SUBSCRIPTIONS):
+            return None
+        return [AttachedSubscription(*row) for row in self.store.subscriptions_of(topic_name)]
+
+    def save(self, kind: str, project_id: str, entities: list, seen_at: Optional[float] = None) -> int:
+        rows = [_row(kind, entity) for entity in entities]
+        try:
+            return self.store.upsert(kind, project_id, rows, seen_at or time.time())
+        except sqlite3.Error as e:  # inventory is best effort, listings go on without it
+            self.logger.error(f"Inventory save failed: {kind}, {project_id}: {e}")
+            return 0
+
+    def complete(self, kind: str, project_id: str, started_at: float) -> int:
+        try:
+            return self.store.complete(kind, project_id, started_at, time.time())
+        except sqlite3.Error as e:
+            self.logger.error(f"Inventory complete failed: {kind}, {project_id}: {e}")
+            return 0
+
+    def snapshot(self, project_ids: Iterable[str], kinds: Iterable[str] = KINDS) -> Dict[str, Counter]:
+        """
+        List every kind in every project, upserting entities page by page. Entities of a completely listed project
+        which were not seen are tombstoned, failed listings leave the stored entities as they are.
+        Returns counts of upserted, deleted entities and listed projects by kind.
+        """
+        started_at = time.time()
+        items = [(kind, project_id) for project_id in project_ids for kind in kinds]
+        workers = const.PUBSUB_META_WORKERS
+        pages = BatchStream(self._pages, items, workers, self.logger, max_pending=workers)
+        stats: Dict[str, Counter] = defaultdict(Counter)
+        for batch in pages:  # single writer, sqlite serializes writes anyway
+            for page in batch:
+                if page.complete:
+                    deleted = self.complete(page.kind, page.project_id, started_at)
+                    stats[page.kind].update(deleted=deleted, projects=1)
+                else:
+                    upserted = self.save(page.kind, page.project_id, page.entities, started_at)
+                    stats[page.kind].update(upserted=upserted)
+        return stats
+
+    def _pages(self, item) -> Iterator[List[_Page]]:
+        kind, project_id = item
+        for entities in self._list(kind, project_id):
+            yield [_Page(kind, project_id, entities)]
+        yield [_Page(kind, project_id, complete=True)]
+
+    def _list(self, kind: str, project_id: str) -> Iterator[list]:
+        parent = f"projects/{project_id}"
+        match kind:
+            case "topics":
+                pages = (page.topics for page in self.client.publisher_client.list_topics(project=parent).pages)
+            case "subscriptions":
+                pager = self.client.subscriber_client.list_subscriptions(project=parent)
+                pages = (page.subscriptions for page in pager.pages)
+            case "snapshots":
+                pages = (page.snapshots for page in self.client.subscriber_client.list_snapshots(project=parent).pages)
+            case "schemas":
+                pages = (page.schemas for page in self.client.schema_client.list_schemas(parent=parent).pages)
+        for page in pages:
+            yield list(page)
+
+
+def _row(kind: str, entity) -> Row:
+    topic: Optional[str] = None
+    dead_letter_topic: Optional[str] = None
+    if kind in (SUBSCRIPTIONS, SNAPSHOTS):
+        topic = entity.topic or None
+    if kind == SUBSCRIPTIONS:
+        dead_letter_topic = entity.dead_letter_policy.dead_letter_topic or None
+    return entity.name, topic, dead_letter_topic, KINDS[kind].serialize(entity)
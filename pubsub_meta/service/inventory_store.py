@@ -0,0 +1,150 @@
+import os
+import sqlite3
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+from pubsub_meta import const
+
+Row = Tuple[str, Optional[str], Optional[str], bytes]  # name, topic, dead letter topic, serialized entity
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entities (
+    name TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    project_id TEXT NOT NULL,
+    topic TEXT,
+    dead_letter_topic TEXT,
+    data BLOB NOT NULL,
+    seen_at REAL NOT NULL,
+    deleted_at REAL
+);
+CREATE INDEX IF NOT EXISTS entities_kind_project ON entities (kind, project_id, deleted_at);
+CREATE INDEX IF NOT EXISTS entities_topic ON entities (topic) WHERE topic IS NOT NULL;
+CREATE INDEX IF NOT EXISTS entities_dead_letter_topic ON entities (dead_letter_topic)
+    WHERE dead_letter_topic IS NOT NULL;
+CREATE TABLE IF NOT EXISTS listings (
+    kind TEXT NOT NULL,
+    project_id TEXT NOT NULL,
+    listed_at REAL NOT NULL,
+    PRIMARY KEY (kind, project_id)
+);
+"""
+
+
+class InventoryStore:
+    """
+    Local SQLite index of listed entities, serialized by name. Times are epoch seconds.
+    Entities missing from a complete listing of their project are kept as tombstones.
+    """
+
+    def __init__(self, path: str = const.PUBSUB_META_INVENTORY) -> None:
+        self.path = path
+        self._local = threading.local()  # sqlite connections can't be shared by threads
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")  # readers are not blocked by a running snapshot
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.path)
+
+    # ====================   Read   ======================
+
+    def listed_at(self, kind: str, project_id: str) -> Optional[float]:
+        if not self.exists():
+            return None
+        row = (
+            self._conn()
+            .execute("SELECT listed_at FROM listings WHERE kind = ? AND project_id = ?", (kind, project_id))
+            .fetchone()
+        )
+        return row[0] if row else None
+
+    def names(self, kind: str, project_id: str) -> Optional[List[str]]:
+        """
+        Names of project's entities, None when the project was not listed completely yet
+        """
+        if self.listed_at(kind, project_id) is None:
+            return None
+        rows = self._conn().execute(
+            "SELECT name FROM entities WHERE kind = ? AND project_id = ? AND deleted_at IS NULL ORDER BY name",
+            (kind, project_id),
+        )
+        return [name for (name,) in rows]
+
+    def get(self, name: str) -> Optional[bytes]:
+        if not self.exists():
+            return None
+        query = "SELECT data FROM entities WHERE name = ? AND deleted_at IS NULL"
+        row = self._conn().execute(query, (name,)).fetchone()
+        return row[0] if row else None
+
+    def listings(self, kind: str) -> int:
+        """
+        Number of projects listed completely
+        """
+        if not self.exists():
+            return 0
+        return self._conn().execute("SELECT COUNT(*) FROM listings WHERE kind = ?", (kind,)).fetchone()[0]
+
+    def subscriptions_of(self, topic: str) -> List[Tuple[str, str, Optional[str]]]:
+        """
+        Name, topic and dead letter topic of subscriptions attached to the topic or dead lettering into it,
+        in any project. Both relations are indexed, '+' keeps the planner off the far less selective kind index.
+        """
+        if not self.exists():
+            return []
+        rows = self._conn().execute(
+            """
+            SELECT name, topic, dead_letter_topic FROM entities
+            WHERE (topic = ? OR dead_letter_topic = ?) AND +kind = 'subscriptions' AND deleted_at IS NULL
+            ORDER BY name
+            """,
+            (topic, topic),
+        )
+        return rows.fetchall()
+
+    # ====================   Write   ======================
+
+    def upsert(self, kind: str, project_id: str, rows: Iterable[Row], seen_at: float) -> int:
+        conn = self._conn()
+        with conn:
+            cursor = conn.executemany(
+                """
+                INSERT INTO entities (name, kind, project_id, topic, dead_letter_topic, data, seen_at, deleted_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, NULL)
+                ON CONFLICT (name) DO UPDATE SET
+                    topic = excluded.topic,
+                    dead_letter_topic = excluded.dead_letter_topic,
+                    data = excluded.data,
+                    seen_at = excluded.seen_at,
+                    deleted_at = NULL
+                """,
+                [(name, kind, project_id, topic, dlq, data, seen_at) for name, topic, dlq, data in rows],
+            )
+        return cursor.rowcount
+
+    def complete(self, kind: str, project_id: str, started_at: float, listed_at: float) -> int:
+        """
+        Mark listing of the project as complete, tombstoning entities not seen since it started
+        """
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                """
+                UPDATE entities SET deleted_at = ?
+                WHERE kind = ? AND project_id = ? AND deleted_at IS NULL AND seen_at < ?
+                """,
+                (listed_at, kind, project_id, started_at),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO listings (kind, project_id, listed_at) VALUES (?, ?, ?)",
+                (kind, project_id, listed_at),
+            )
+        return cursor.rowcount
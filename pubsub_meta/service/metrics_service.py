@@ -1,40 +1,342 @@
-from datetime import datetime, timedelta
+import heapq
+import math
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from datetime import datetime, timezone
+from itertools import islice
+from operator import itemgetter
+from typing import TYPE_CHECKING, Dict, Hashable, Iterable, List, Optional, Tuple
 
-from google.cloud.monitoring_v3 import ListTimeSeriesRequest, TimeInterval
-from google.protobuf.timestamp_pb2 import Timestamp
+from pubsub_meta import const
 from pubsub_meta.client import Client
 from pubsub_meta.logger import Logger
+from pubsub_meta.service.series_cache import Point, SeriesCache, align
+from pubsub_meta.types import MetricAggregation, SubscriptionParsed, TimeSeries
+
+if TYPE_CHECKING:  # monitoring is imported on the first query, it is not needed until metrics tab is open
+    from google.cloud.monitoring_v3 import Aggregation
+
+SUBSCRIPTION_METRIC_PREFIX = "pubsub.googleapis.com/subscription/"
+TOPIC_METRIC_PREFIX = "pubsub.googleapis.com/topic/"
+SUBSCRIPTIONS_PER_REQUEST = 100  # values of one_of() in a single filter
+MIN_ALIGNMENT_PERIOD = 60  # seconds, sampling period of pubsub metrics
+TOP_SPAN = 300  # seconds, subscriptions are ranked by their value aligned over this span
+
+METRIC_AGGREGATIONS = {
+    "sent_message_count": MetricAggregation(aligner="ALIGN_SUM", reducer="REDUCE_SUM"),
+    "num_undelivered_messages": MetricAggregation(aligner="ALIGN_MEAN", reducer="REDUCE_SUM"),
+    "oldest_unacked_message_age": MetricAggregation(aligner="ALIGN_MAX", reducer="REDUCE_MAX"),
+    "ack_message_count": MetricAggregation(aligner="ALIGN_RATE", reducer="REDUCE_SUM"),  # per second
+    "nack_requests": MetricAggregation(aligner="ALIGN_RATE", reducer="REDUCE_SUM"),
+}
+
+TOPIC_METRIC_AGGREGATIONS = {
+    "send_request_count": MetricAggregation(aligner="ALIGN_SUM", reducer="REDUCE_SUM"),  # all response codes
+    "byte_cost": MetricAggregation(aligner="ALIGN_SUM", reducer="REDUCE_SUM"),
+    "message_sizes": MetricAggregation(aligner="ALIGN_PERCENTILE_50", reducer="REDUCE_MEAN"),  # distribution median
+}
+
+SeriesKey = Tuple[SubscriptionParsed, str]
 
 
 class MetricsService:
     def __init__(self, client: Client, logger: Logger) -> None:
         self.client = client
         self.logger = logger
+        self.series_cache = SeriesCache()
+        self.executor = ThreadPoolExecutor(max_workers=const.PUBSUB_META_WORKERS, thread_name_prefix="monitoring")
+
+    def get_undelivered_messages(
+        self, project_id: str, subscription_id: str, now: datetime, timeout: Optional[float] = None
+    ) -> TimeSeries:
+        return self._list_time_series(project_id, subscription_id, now, "num_undelivered_messages", timeout)
+
+    def get_sent_messages(
+        self, project_id: str, subscription_id: str, now: datetime, timeout: Optional[float] = None
+    ) -> TimeSeries:
+        return self._list_time_series(project_id, subscription_id, now, "sent_message_count", timeout)
+
+    def list_time_series_batch(
+        self,
+        subs: Iterable[SubscriptionParsed],
+        metrics: Iterable[str],
+        now: datetime,
+        timeout: Optional[float] = None,
+        points: Optional[int] = None,
+        aggregation: Optional[MetricAggregation] = None,
+        window: Optional[int] = None,
+        cache: bool = True,
+    ) -> Dict[SeriesKey, TimeSeries]:
+        """
+        Series of every metric for every subscription, one request per metric and project (and chunk of subscriptions).
+        Monitoring accepts a single metric type per filter, subscription ids are OR-ed and results split by label.
+        Points are aligned server-side, using aggregation or the metric's default one, at most `points` per series.
+        Already fetched points are cached, only the interval since the last fetch is requested. One-off queries
+        (e.g. exports) skip the cache, keeping memory independent of the number of subscriptions.
+        """
+        window = window or const.PUBSUB_META_METRICS_WINDOW
+        subs_by_project: Dict[str, List[str]] = defaultdict(list)
+        for sub in set(subs):
+            subs_by_project[sub.project_id].append(sub.subscription_id)
+
+        end = now.replace(tzinfo=timezone.utc).timestamp()
+        series: Dict[SeriesKey, TimeSeries] = {}
+        for metric in sorted(set(metrics)):
+            metric_aggregation = aggregation or METRIC_AGGREGATIONS.get(metric, MetricAggregation())
+            period = _period(metric_aggregation, window, points)
+            for project_id, subscription_ids in subs_by_project.items():
+                subscription_ids.sort()
+                for i in range(0, len(subscription_ids), SUBSCRIPTIONS_PER_REQUEST):
+                    chunk = subscription_ids[i : i + SUBSCRIPTIONS_PER_REQUEST]
+                    cache_keys = {
+                        subscription_id: (project_id, subscription_id, metric, metric_aggregation, period)
+                        for subscription_id in chunk
+                    }
+                    metric_filter = _batch_filter(metric, chunk)
+                    fetched = self._fetch(
+                        project_id,
+                        metric_filter,
+                        cache_keys,
+                        "subscription_id",
+                        metric_aggregation,
+                        period,
+                        end,
+                        window,
+                        timeout,
+                        cache,
+                    )
+                    for subscription_id, sub_series in fetched.items():
+                        series[(SubscriptionParsed(project_id, subscription_id), metric)] = sub_series
+        return series
+
+    def list_topic_time_series(
+        self,
+        topic_name: str,
+        metrics: Iterable[str],
+        now: datetime,
+        timeout: Optional[float] = None,
+        points: Optional[int] = None,
+    ) -> Dict[str, TimeSeries]:
+        """
+        Series of topic metrics by metric, each reduced server-side into a single series, requested concurrently
+        """
+        [_, project_id, _, topic_id] = topic_name.split("/")
+        window = const.PUBSUB_META_METRICS_WINDOW
+        end = now.replace(tzinfo=timezone.utc).timestamp()
+
+        def fetch(metric: str) -> TimeSeries:
+            aggregation = TOPIC_METRIC_AGGREGATIONS.get(metric, MetricAggregation())
+            period = _period(aggregation, window, points)
+            metric_filter = f'metric.type = "{TOPIC_METRIC_PREFIX}{metric}" AND resource.labels.topic_id = "{topic_id}"'
+            cache_keys = {"": (project_id, topic_id, metric, aggregation, period)}
+            series = self._fetch(project_id, metric_filter, cache_keys, None, aggregation, period, end, window, timeout)
+            return series[""]
+
+        metrics = list(metrics)
+        return dict(zip(metrics, self.executor.map(fetch, metrics)))
+
+    def get_backlog_rollup(
+        self,
+        subscription_names: Iterable[str],
+        now: datetime,
+        timeout: Optional[float] = None,
+        points: Optional[int] = None,
+        metric: str = "num_undelivered_messages",
+    ) -> TimeSeries:
+        """
+        Metric summed over all subscriptions. Subscriptions are reduced server-side into one series per request
+        (project and chunk of subscriptions), requests run concurrently and their series are summed here.
+        """
+        window = const.PUBSUB_META_METRICS_WINDOW
+        end = now.replace(tzinfo=timezone.utc).timestamp()
+        aggregation = METRIC_AGGREGATIONS.get(metric, MetricAggregation())
+        period = _period(aggregation, window, points)
+        subs_by_project: Dict[str, List[str]] = defaultdict(list)
+        for name in set(subscription_names):
+            sub = SubscriptionParsed.from_subscription(name)
+            subs_by_project[sub.project_id].append(sub.subscription_id)
+
+        chunks = []
+        for project_id, subscription_ids in subs_by_project.items():
+            subscription_ids.sort()
+            for i in range(0, len(subscription_ids), SUBSCRIPTIONS_PER_REQUEST):
+                chunks.append((project_id, tuple(subscription_ids[i : i + SUBSCRIPTIONS_PER_REQUEST])))
+
+        def fetch(chunk: Tuple[str, Tuple[str, ...]]) -> TimeSeries:
+            project_id, subscription_ids = chunk
+            metric_filter = _batch_filter(metric, list(subscription_ids))
+            cache_keys = {"": (project_id, subscription_ids, metric, aggregation, period)}
+            series = self._fetch(project_id, metric_filter, cache_keys, None, aggregation, period, end, window, timeout)
+            return series[""]
+
+        totals: Dict[float, float] = defaultdict(float)
+        for chunk_series in self.executor.map(fetch, chunks):
+            for timestamp, value in zip(chunk_series.timestamps, chunk_series.values):
+                totals[timestamp] += value  # aligned to the same period boundaries, as requests share the end time
+        return TimeSeries.from_points(sorted(totals.items()))
+
+    def top_subscriptions(
+        self,
+        project_ids: Iterable[str],
+        metric: str,
+        n: int,
+        now: datetime,
+        deadline: Optional[float] = None,
+    ) -> List[Tuple[float, SubscriptionParsed]]:
+        """
+        N subscriptions with the largest value of metric across all projects, largest first.
+        One request per project, reduced server-side into a series per subscription and aligned into a single point.
+        Requests run concurrently, top N of every project are merged with a heap. Failed projects are skipped.
+        Requests queue for workers, each one gets the time left until deadline (time.monotonic()), if any.
+        """
+        end = now.replace(tzinfo=timezone.utc).timestamp()
+        aggregation = replace(METRIC_AGGREGATIONS.get(metric, MetricAggregation()), alignment_period=TOP_SPAN)
+        metric_type = f'"{SUBSCRIPTION_METRIC_PREFIX}{metric}"'
+        metric_filter = f'metric.type = {metric_type} AND resource.type = "pubsub_subscription"'
+
+        def project_top(project_id: str) -> List[Tuple[float, SubscriptionParsed]]:
+            from google.api.metric_pb2 import MetricDescriptor
+
+            timeout = deadline - time.monotonic() if deadline is not None else None
+            if timeout is not None and timeout <= 0:
+                self.logger.error(f"Top {metric} skipped, deadline exceeded: {project_id}")
+                return []
+            try:
+                results = self._request(
+                    project_id, metric_filter, end - TOP_SPAN, end, aggregation, TOP_SPAN, timeout, "subscription_id"
+                )
+                latest = []
+                for result in results:
+                    if not result.points:
+                        continue
+                    point = max(result.points, key=lambda p: p.interval.end_time.timestamp())
+                    is_double = result.value_type == MetricDescriptor.ValueType.DOUBLE
+                    value = point.value.double_value if is_double else point.value.int64_value
+                    sub = SubscriptionParsed(project_id, result.resource.labels["subscription_id"])
+                    latest.append((value, sub))
+                return heapq.nlargest(n, latest, key=itemgetter(0))
+            except Exception as e:
+                self.logger.error(f"Top {metric} failed: {project_id}: {e}")
+                return []
 
-    def get_undelivered_messages(self, project_id: str, subscription_id: str, now: datetime) -> tuple[list, list]:
-        return self._list_time_series(project_id, subscription_id, now, "num_undelivered_messages")
+        tops = list(self.executor.map(project_top, project_ids))
+        return list(islice(heapq.merge(*tops, key=itemgetter(0), reverse=True), n))
 
-    def get_sent_messages(self, project_id: str, subscription_id: str, now: datetime) -> tuple[list, list]:
-        return self._list_time_series(project_id, subscription_id, now, "sent_message_count")
+    def _fetch(
+        self,
+        project_id: str,
+        metric_filter: str,
+        cache_keys: Dict[str, Hashable],
+        label: Optional[str],
+        aggregation: MetricAggregation,
+        period: int,
+        end: float,
+        window: int,
+        timeout: Optional[float],
+        cache: bool = True,
+    ) -> Dict[str, TimeSeries]:
+        """
+        Series split by value of resource label, the ones without points are empty.
+        Without label, series are reduced into one, keyed by "".
+        Interval is snapped to the grid of period, so buckets of consecutive fetches line up with the cached ones.
+        """
+        from google.api.metric_pb2 import MetricDescriptor
+
+        end = align(end, period)
+        if cache:
+            start = self.series_cache.start(cache_keys.values(), end, window, period)
+        else:
+            start = align(end - window, period)
+        results = self._request(project_id, metric_filter, start, end, aggregation, period, timeout, label)
+        fetched: Dict[str, List[Point]] = defaultdict(list)
+        for result in results:
+            is_double = result.value_type == MetricDescriptor.ValueType.DOUBLE
+            label_points = fetched[result.resource.labels[label] if label else ""]
+            for point in result.points:
+                value = point.value.double_value if is_double else point.value.int64_value
+                label_points.append((point.interval.end_time.timestamp(), value))
+        series = {}
+        for label_value, cache_key in cache_keys.items():
+            label_points = fetched.get(label_value, [])
+            if cache:
+                series[label_value] = self.series_cache.merge(cache_key, start, end, window, period, label_points)
+            else:
+                series[label_value] = TimeSeries.from_points(sorted(label_points))
+        return series
+
+    def _list_time_series(
+        self, project_id: str, subscription_id: str, now: datetime, metric: str, timeout: Optional[float] = None
+    ):
+        sub = SubscriptionParsed(project_id, subscription_id)
+        series = self.list_time_series_batch([sub], [metric], now, timeout)
+        return series[(sub, metric)]
+
+    def _request(
+        self,
+        project_id: str,
+        metric_filter: str,
+        start_time: float,
+        end_time: float,
+        aggregation: MetricAggregation,
+        period: int,
+        timeout: Optional[float],
+        label: Optional[str] = None,
+    ):
+        from google.cloud.monitoring_v3 import ListTimeSeriesRequest, TimeInterval
+        from google.protobuf.timestamp_pb2 import Timestamp
 
-    def _list_time_series(self, project_id: str, subscription_id: str, now: datetime, metric: str):
         start = Timestamp()
-        start.FromDatetime(dt=now - timedelta(hours=1))
+        start.FromNanoseconds(int(start_time * 1e9))
         end = Timestamp()
-        end.FromDatetime(dt=now)
+        end.FromNanoseconds(int(end_time * 1e9))
         interval = TimeInterval({"start_time": start, "end_time": end})
         request = {
             "name": f"projects/{project_id}",
-            "filter": f'metric.type = "pubsub.googleapis.com/subscription/{metric}" AND resource.labels.subscription_id = "{subscription_id}"',
+            "filter": metric_filter,
             "interval": interval,
             "view": ListTimeSeriesRequest.TimeSeriesView.FULL,
         }
-        results = self.client.metrics_client.list_time_series(request)
-        points = []
-        dates = []
-        for result in results:
-            self.logger.info(result)
-            for point in result.points:
-                points.append(point.value.int64_value)
-                dates.append(point.interval.end_time)
-        return dates, points
+        if aggregation.aligner != "ALIGN_NONE":
+            request["aggregation"] = _aggregation(aggregation, period, label)
+        self.logger.info(f"List time series: {project_id}, {start_time} - {end_time}, {metric_filter}")
+        return self.client.metrics_client.list_time_series(request, timeout=timeout)
+
+
+def _alignment_period(window: int, points: Optional[int]) -> int:
+    if not points:
+        return MIN_ALIGNMENT_PERIOD
+    period = math.ceil(window / points / MIN_ALIGNMENT_PERIOD) * MIN_ALIGNMENT_PERIOD
+    return max(period, MIN_ALIGNMENT_PERIOD)
+
+
+def _period(aggregation: MetricAggregation, window: int, points: Optional[int]) -> int:
+    if aggregation.aligner == "ALIGN_NONE":
+        return MIN_ALIGNMENT_PERIOD
+    return aggregation.alignment_period or _alignment_period(window, points)
+
+
+def _aggregation(aggregation: MetricAggregation, period: int, label: Optional[str]) -> "Aggregation":
+    from google.cloud.monitoring_v3 import Aggregation
+
+    group_by = set(aggregation.group_by)
+    if label and aggregation.reducer != "REDUCE_NONE":
+        group_by.add(f"resource.label.{label}")  # results are split by label, e.g. by subscription
+    return Aggregation(
+        {
+            "alignment_period": {"seconds": period},
+            "per_series_aligner": Aggregation.Aligner[aggregation.aligner],
+            "cross_series_reducer": Aggregation.Reducer[aggregation.reducer],
+            "group_by_fields": sorted(group_by),
+        }
+    )
+
+
+def _one_of(values: Iterable[str]) -> str:
+    return "one_of(" + ", ".join(f'"{value}"' for value in values) + ")"
+
+
+def _batch_filter(metric: str, subscription_ids: List[str]) -> str:
+    metric_type = f'"{SUBSCRIPTION_METRIC_PREFIX}{metric}"'
+    return f"metric.type = {metric_type} AND resource.labels.subscription_id = {_one_of(subscription_ids)}"
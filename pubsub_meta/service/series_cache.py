@@ -0,0 +1,87 @@
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Hashable, Iterable, List, Tuple
+
+from pubsub_meta.types import TimeSeries
+
+Point = Tuple[float, float]  # epoch seconds, value
+
+
+def align(timestamp: float, period: int) -> float:
+    """
+    Timestamp floored to the alignment grid. Monitoring aligns buckets relative to the interval end,
+    so requests ending on the grid return buckets at the same timestamps on every refresh.
+    """
+    return timestamp // period * period
+
+
+@dataclass
+class _Series:
+    end: float
+    window: int
+    points: Deque[Point] = field(default_factory=deque)
+
+
+class SeriesCache:
+    """
+    Already fetched points of every series, kept in a ring buffer bounded by the metrics window.
+    Times are epoch seconds, snapped to the grid of period. Series are keyed by key and period.
+    Series not fetched for longer than their window are evicted, none of their points would be shown anymore.
+    """
+
+    def __init__(self) -> None:
+        self._series: Dict[Hashable, _Series] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def start(self, keys: Iterable[Hashable], now: float, window: int, period: int) -> float:
+        """
+        Start of the interval missing in all of the series, the last period is fetched again as it may be incomplete
+        """
+        window_start = align(now - window, period)
+        with self._lock:
+            self._evict(now)
+            ends = [self._series[(key, period)].end if (key, period) in self._series else window_start for key in keys]
+        if not ends:
+            return window_start
+        return max(min(ends) - period, window_start)
+
+    def merge(
+        self,
+        key: Hashable,
+        start: float,
+        now: float,
+        window: int,
+        period: int,
+        points: List[Point],
+    ) -> TimeSeries:
+        """
+        Replace cached points after start with fetched ones, evicting points outside of the window
+        """
+        now = align(now, period)
+        start = align(start, period)
+        window_start = align(now - window, period)
+        with self._lock:
+            series = self._series.get((key, period))
+            if not series:
+                series = _Series(end=now, window=window, points=deque(maxlen=window // period + 1))
+                self._series[(key, period)] = series
+            while series.points and series.points[-1][0] > start:
+                series.points.pop()
+            series.points.extend(sorted(point for point in points if point[0] > start))
+            while series.points and series.points[0][0] <= window_start:  # as fetched, points after window start
+                series.points.popleft()
+            series.end = now
+            return TimeSeries.from_points(series.points)
+
+    def _evict(self, now: float):
+        stale = [key for key, series in self._series.items() if series.end + series.window < now]
+        for key in stale:
+            del self._series[key]
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
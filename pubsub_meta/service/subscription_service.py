@@ -1,12 +1,16 @@
-from typing import Optional
+import time
+from typing import Iterator, List, Optional
 
-from google.pubsub_v1.services.subscriber.pagers import ListSubscriptionsPager
 from google.pubsub_v1.types.pubsub import Subscription
+from pubsub_meta import const
 from pubsub_meta.client import Client
 from pubsub_meta.config import Config
+from pubsub_meta.logger import Logger
+from pubsub_meta.service.cache_service import SUBSCRIPTIONS, CacheService
+from pubsub_meta.service.inventory_service import InventoryService
 from pubsub_meta.service.project_service import ProjectService
 from pubsub_meta.util import bash_util
-from pubsub_meta.util.rich_utils import progress
+from pubsub_meta.util.concurrent_utils import BatchStream
 from rich.console import Console
 from rich.live import Live
 
@@ -15,17 +19,30 @@ class SubscriptionService:
     def __init__(
         self,
         console: Console,
+        logger: Logger,
         config: Config,
         client: Client,
         project_service: ProjectService,
+        cache_service: CacheService,
+        inventory_service: Optional[InventoryService] = None,
+        offline: bool = False,
     ) -> None:
         self.console = console
+        self.logger = logger
         self.config = config
         self.client = client
         self.project_service = project_service
+        self.cache_service = cache_service
+        self.inventory_service = inventory_service
+        self.offline = offline  # names from the cache, subscriptions from the inventory, no requests
 
     def get_subscription(self, sub_name: str) -> Optional[Subscription]:
-        return self.client.subscriber_client.get_subscription(subscription=sub_name)
+        if self.offline:
+            return self.inventory_service.get(SUBSCRIPTIONS, sub_name) if self.inventory_service else None
+        subscription = self.client.subscriber_client.get_subscription(subscription=sub_name)
+        if self.inventory_service:
+            self.inventory_service.save(SUBSCRIPTIONS, sub_name.split("/")[1], [subscription])
+        return subscription
 
     def pick_subscription(self, live: Live) -> Optional[Subscription]:
         subscription = None
@@ -34,9 +51,62 @@ class SubscriptionService:
         if project_id:
             sub_name = self._pick_subscription(project_id, live)
         if sub_name:
-            subscription = self.client.subscriber_client.get_subscription(subscription=sub_name)
+            subscription = self.get_subscription(sub_name)
+        return subscription
+
+    def pick_subscription_global(self, live: Live) -> Optional[Subscription]:
+        """
+        Pick subscription across all projects, names are streamed into picker as each project's pages arrive
+        """
+        subscription = None
+        project_ids = self.project_service.list_projects()
+        names = BatchStream(self._iter_subscription_names, project_ids, const.PUBSUB_META_WORKERS, self.logger)
+        subscription_name = bash_util.pick_one_stream(names, live)
+        if subscription_name:
+            subscription = self.get_subscription(subscription_name)
         return subscription
 
+    def iter_subscriptions(self, project_id: str) -> Iterator[List[Subscription]]:
+        """
+        Pages of project's subscriptions as they arrive, saved to the inventory when listed completely
+        """
+        started_at = time.time()
+        pager = self.client.subscriber_client.list_subscriptions(project=f"projects/{project_id}")
+        for page in pager.pages:
+            subscriptions = list(page.subscriptions)
+            if self.inventory_service:
+                self.inventory_service.save(SUBSCRIPTIONS, project_id, subscriptions, started_at)
+            yield subscriptions
+        if self.inventory_service:
+            self.inventory_service.complete(SUBSCRIPTIONS, project_id, started_at)
+
+    def invalidate_cache(self):
+        self.cache_service.invalidate(SUBSCRIPTIONS)
+
+    # ======================   List   ======================
+
+    def _list_subscription_names(self, project_id: str) -> List[str]:
+        return [subscription.name for page in self.iter_subscriptions(project_id) for subscription in page]
+
+    def _iter_subscription_names(self, project_id: str) -> Iterator[List[str]]:
+        if self.offline:
+            subscription_names = self.cache_service.get(SUBSCRIPTIONS, project_id)
+            if subscription_names is not None:  # never listed projects are left out
+                yield subscription_names
+            return
+        subscription_names = self.cache_service.lookup(
+            SUBSCRIPTIONS, project_id, lambda: self._list_subscription_names(project_id)
+        )
+        if subscription_names is not None:
+            yield subscription_names
+            return
+        subscription_names = []
+        for page in self.iter_subscriptions(project_id):
+            page_names = [subscription.name for subscription in page]
+            subscription_names.extend(page_names)
+            yield page_names
+        self.cache_service.save(SUBSCRIPTIONS, project_id, subscription_names)
+
     # ======================   Pick   ======================
 
     def _pick_project_id(self, live: Live) -> Optional[str]:
@@ -44,9 +114,8 @@ class SubscriptionService:
         return bash_util.pick_one(project_ids, live)
 
     def _pick_subscription(self, project_id: str, live: Live) -> Optional[str]:
-        subscriptions = []
-        subs = self.client.subscriber_client.list_subscriptions(project=f"projects/{project_id}")
-        subs_progress: ListSubscriptionsPager = progress(self.console, "subscriptions", subs)
-        for subscription in subs_progress:
-            subscriptions.append(subscription.name)
-        return bash_util.pick_one(subscriptions, live)
+        """
+        Subscription names go into picker page by page, only names are kept
+        """
+        names = BatchStream(self._iter_subscription_names, [project_id], 1, self.logger)
+        return bash_util.pick_one_stream(names, live)
@@ -1,30 +1,48 @@
-from typing import Optional
+import time
+from typing import Iterator, List, Optional
 from pubsub_meta.config import Config
+from pubsub_meta.logger import Logger
+from pubsub_meta import const
 from pubsub_meta.client import Client
 from rich.console import Console
 from rich.live import Live
-from pubsub_meta.util.rich_utils import progress
 from pubsub_meta.util import bash_util
+from pubsub_meta.util.concurrent_utils import BatchStream
 from google.pubsub_v1.types.pubsub import Topic
+from pubsub_meta.service.cache_service import TOPICS, CacheService
+from pubsub_meta.service.inventory_service import InventoryService
 from pubsub_meta.service.project_service import ProjectService
-from google.pubsub_v1.services.publisher.pagers import ListTopicsPager
+from pubsub_meta.types import AttachedSubscription
 
 
 class TopicService:
     def __init__(
         self,
         console: Console,
+        logger: Logger,
         config: Config,
         client: Client,
         project_service: ProjectService,
+        cache_service: CacheService,
+        inventory_service: Optional[InventoryService] = None,
+        offline: bool = False,
     ) -> None:
         self.console = console
+        self.logger = logger
         self.config = config
         self.client = client
         self.project_service = project_service
+        self.cache_service = cache_service
+        self.inventory_service = inventory_service
+        self.offline = offline  # names from the cache, topics from the inventory, no requests
 
     def get_topic(self, topic_name: str) -> Optional[Topic]:
-        return self.client.publisher_client.get_topic(topic=topic_name)
+        if self.offline:
+            return self.inventory_service.get(TOPICS, topic_name) if self.inventory_service else None
+        topic = self.client.publisher_client.get_topic(topic=topic_name)
+        if self.inventory_service:
+            self.inventory_service.save(TOPICS, topic_name.split("/")[1], [topic])
+        return topic
 
     def pick_topic(self, live: Live) -> Optional[Topic]:
         topic = None
@@ -33,9 +51,79 @@ class TopicService:
         if project_id:
             topic_name = self._pick_topic_name(project_id, live)
         if topic_name:
-            topic = self.client.publisher_client.get_topic(topic=topic_name)
+            topic = self.get_topic(topic_name)
+        return topic
+
+    def pick_topic_global(self, live: Live) -> Optional[Topic]:
+        """
+        Pick topic across all projects, names are streamed into picker as each project's pages arrive
+        """
+        topic = None
+        project_ids = self.project_service.list_projects()
+        names = BatchStream(self._iter_topic_names, project_ids, const.PUBSUB_META_WORKERS, self.logger)
+        topic_name = bash_util.pick_one_stream(names, live)
+        if topic_name:
+            topic = self.get_topic(topic_name)
         return topic
 
+    def iter_topics(self, project_id: str) -> Iterator[List[Topic]]:
+        """
+        Pages of project's topics as they arrive, saved to the inventory when listed completely
+        """
+        started_at = time.time()
+        pager = self.client.publisher_client.list_topics(project=f"projects/{project_id}")
+        for page in pager.pages:
+            topics = list(page.topics)
+            if self.inventory_service:
+                self.inventory_service.save(TOPICS, project_id, topics, started_at)
+            yield topics
+        if self.inventory_service:
+            self.inventory_service.complete(TOPICS, project_id, started_at)
+
+    def attached_subscriptions(self, topic_name: str) -> Optional[List[AttachedSubscription]]:
+        """
+        Subscriptions of topic in any project and the ones dead lettering into it, looked up in the inventory
+        """
+        if not self.inventory_service:
+            return None
+        return self.inventory_service.attached_subscriptions(topic_name)
+
+    def topic_subscriptions(self, topic_name: str) -> List[str]:
+        """
+        Names of subscriptions receiving topic's messages, from the inventory when indexed
+        """
+        attached = self.attached_subscriptions(topic_name)
+        if attached is not None:
+            return [sub.name for sub in attached if sub.topic == topic_name]
+        if self.offline:
+            return []
+        return list(self.client.publisher_client.list_topic_subscriptions(topic=topic_name))
+
+    def invalidate_cache(self):
+        self.cache_service.invalidate(TOPICS)
+
+    # ======================   List   ======================
+
+    def _list_topic_names(self, project_id: str) -> List[str]:
+        return [topic.name for page in self.iter_topics(project_id) for topic in page]
+
+    def _iter_topic_names(self, project_id: str) -> Iterator[List[str]]:
+        if self.offline:
+            topic_names = self.cache_service.get(TOPICS, project_id)
+            if topic_names is not None:  # never listed projects are left out
+                yield topic_names
+            return
+        topic_names = self.cache_service.lookup(TOPICS, project_id, lambda: self._list_topic_names(project_id))
+        if topic_names is not None:
+            yield topic_names
+            return
+        topic_names = []
+        for page in self.iter_topics(project_id):
+            page_names = [topic.name for topic in page]
+            topic_names.extend(page_names)
+            yield page_names
+        self.cache_service.save(TOPICS, project_id, topic_names)
+
     # ======================   Pick   ======================
 
     def _pick_project_id(self, live: Live) -> Optional[str]:
@@ -43,9 +131,8 @@ class TopicService:
         return bash_util.pick_one(project_ids, live)
 
     def _pick_topic_name(self, project_id: str, live: Live) -> Optional[str]:
-        topic_names = []
-        topics = self.client.publisher_client.list_topics(project=f"projects/{project_id}")
-        topics_progress: ListTopicsPager = progress(self.console, "topics", topics)
-        for topic in topics_progress:
-            topic_names.append(topic.name)
-        return bash_util.pick_one(topic_names, live)
+        """
+        Topic names go into picker page by page, only names are kept
+        """
+        names = BatchStream(self._iter_topic_names, [project_id], 1, self.logger)
+        return bash_util.pick_one_stream(names, live)
@@ -1,26 +1,65 @@
+import threading
+import time
+from typing import Callable, Optional
+
+from pubsub_meta import const
 from pubsub_meta.config import Config
-import requests
+from pubsub_meta.logger import Logger
 from importlib.metadata import version
 
+VERSION_CHECK_TIMEOUT = 3  # seconds
+
 
 class VersionService:
-    def __init__(self):
-        ...
+    def __init__(self, config: Config, logger: Logger):
+        self.config = config
+        self.logger = logger
+
+    def update_config_async(self, on_update: Callable[[], None]):
+        """
+        Check available version in the background at most once per PUBSUB_META_VERSION_CHECK_TTL,
+        on_update is called once the config holds the result. Installed version is read every time.
+        """
+        self.update_current_version()
+        checked_at = self.config.version_checked_at
+        if checked_at and time.time() - checked_at < const.PUBSUB_META_VERSION_CHECK_TTL:
+            return
+        thread = threading.Thread(target=self._update_config, args=(on_update,), name="version", daemon=True)
+        thread.start()
+
+    def _update_config(self, on_update: Callable[[], None]):
+        try:
+            self.update_config()
+            on_update()
+        except Exception as e:
+            self.logger.error(f"Version check failed: {e}")
+
+    def update_current_version(self):
+        """
+        Installed version, read locally, so an upgrade shows up right away and not only after the next check
+        """
+        current_version = VersionService._get_current_version()
+        if current_version != self.config.current_version:
+            self.config.current_version = current_version
 
-    def update_config(self, config: Config):
+    def update_config(self):
         available_version = VersionService._get_available_version()
         current_version = VersionService._get_current_version()
-        config.available_version = available_version
-        config.current_version = current_version
+        with self.config.transaction():
+            self.config.available_version = available_version
+            self.config.current_version = current_version
+            self.config.version_checked_at = time.time()
+
+    def _get_available_version() -> Optional[str]:
+        import requests
 
-    def _get_available_version() -> str:
         package = "pubsub-meta"
         url = f"https://pypi.org/pypi/{package}/json"
-        response: dict = requests.request("GET", url).json()
+        response: dict = requests.request("GET", url, timeout=VERSION_CHECK_TIMEOUT).json()
         version = response.get("info", None).get("version", None)
         return version
 
-    def _get_current_version() -> str:
+    def _get_current_version() -> Optional[str]:
         try:
             ver = version("pubsub-meta")
         except:
@@ -1,7 +1,12 @@
-from dataclasses import dataclass
+import itertools
+from array import array
+from dataclasses import dataclass, field
+from typing import Iterable, Optional, Tuple
 
+_series_versions = itertools.count()
 
-@dataclass
+
+@dataclass(frozen=True)
 class SubscriptionParsed:
     project_id: str
     subscription_id: str
@@ -13,3 +18,67 @@ class SubscriptionParsed:
             project_id=project_id,
             subscription_id=subscription_id,
         )
+
+
+@dataclass(frozen=True)
+class AttachedSubscription:
+    """
+    Subscription related to a topic, either receiving its messages or dead lettering into it
+    """
+
+    name: str
+    topic: str
+    dead_letter_topic: Optional[str] = None
+
+    @property
+    def project_id(self) -> str:
+        return self.name.split("/")[1]
+
+
+@dataclass(frozen=True)
+class MetricAggregation:
+    """
+    Server-side aggregation of a metrics query, names of monitoring_v3.Aggregation aligners and reducers
+    """
+
+    aligner: str = "ALIGN_NONE"
+    reducer: str = "REDUCE_NONE"
+    group_by: Tuple[str, ...] = ()
+    alignment_period: Optional[int] = None  # seconds, derived from the number of displayed points when not set
+
+
+@dataclass
+class TimeSeries:
+    """
+    Columnar series, epoch seconds (UTC) and values in compact double arrays.
+    Series are not modified once built, version identifies the data e.g. for render caching.
+    """
+
+    timestamps: array = field(default_factory=lambda: array("d"))
+    values: array = field(default_factory=lambda: array("d"))
+    version: int = field(default_factory=lambda: next(_series_versions), compare=False)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @staticmethod
+    def from_points(points: Iterable[Tuple[float, float]]):
+        series = TimeSeries()
+        for timestamp, value in points:
+            series.timestamps.append(timestamp)
+            series.values.append(value)
+        return series
+
+
+@dataclass(frozen=True)
+class BacklogAnalytics:
+    """
+    Latest state of a subscription's backlog, rates are in messages per second averaged over a recent span
+    """
+
+    backlog: Optional[float] = None  # messages
+    oldest_unacked_age: Optional[float] = None  # seconds
+    ack_rate: Optional[float] = None
+    nack_rate: Optional[float] = None
+    drain_rate: Optional[float] = None  # net rate the backlog shrinks by, negative when it grows
+    drain_eta: Optional[float] = None  # seconds until the backlog is consumed, None when it is not shrinking
@@ -1,7 +1,12 @@
 import subprocess
 import tempfile
+import threading
 from rich.live import Live
-from typing import List, Optional
+from typing import IO, List, Optional
+
+from pubsub_meta import const
+from pubsub_meta.util.concurrent_utils import BatchStream
+from pubsub_meta.util.fuzzy_picker import FuzzyPicker
 
 
 def _run_fzf(choices: List[str], live: Live) -> List[str]:
@@ -24,6 +29,40 @@ def _run_fzf(choices: List[str], live: Live) -> List[str]:
     return selection
 
 
+def _write_batches(batches: BatchStream, stdin: IO[bytes]):
+    try:
+        for batch in batches:
+            if batch:
+                stdin.write(("\n".join(batch) + "\n").encode("utf-8"))
+                stdin.flush()
+        stdin.close()
+    except (BrokenPipeError, ValueError):  # fzf exited before all batches arrived
+        batches.cancel()
+
+
+def _run_fzf_stream(batches: BatchStream, live: Live) -> List[str]:
+    live.stop()
+    fzf = subprocess.Popen(["fzf", "--ansi"], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    writer = threading.Thread(target=_write_batches, args=(batches, fzf.stdin), name="fzf", daemon=True)
+    writer.start()
+    selection = [line.decode("utf-8").strip("\n") for line in fzf.stdout.readlines()]
+    fzf.wait()
+    batches.cancel()
+    if live:
+        live.start()
+    return selection
+
+
 def pick_one(choices: List[str], live: Live) -> Optional[str]:
-    result = next(iter(_run_fzf(choices, live)), None)
-    return result
+    if const.PUBSUB_META_PICKER == "fzf":
+        return next(iter(_run_fzf(choices, live)), None)
+    return FuzzyPicker(live).pick([choices[::-1]])  # most recent first
+
+
+def pick_one_stream(batches: BatchStream, live: Live) -> Optional[str]:
+    """
+    Pick from choices while they are still arriving
+    """
+    if const.PUBSUB_META_PICKER == "fzf":
+        return next(iter(_run_fzf_stream(batches, live)), None)
+    return FuzzyPicker(live).pick(batches, on_close=batches.cancel)
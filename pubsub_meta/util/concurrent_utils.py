@@ -0,0 +1,101 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Generic, Iterable, Iterator, List, Optional, TypeVar
+
+from pubsub_meta.logger import Logger
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_DONE = object()
+
+
+class _Submitted:
+    def __init__(self, count: int) -> None:
+        self.count = count  # items submitted in total, the stream ends once all of them are done
+
+
+class BatchStream(Generic[T, R]):
+    """
+    Runs fn for every item in a bounded thread pool, iterating produced batches in order of arrival.
+    Items are consumed lazily (e.g. names read from stdin), at most max_workers of them wait for a worker.
+    With max_pending, workers wait while that many batches are not consumed yet, bounding memory.
+    Items whose fn failed are collected in failed, once the stream is iterated.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[T], Iterable[List[R]]],
+        items: Iterable[T],
+        max_workers: int,
+        logger: Logger,
+        max_pending: int = 0,
+    ) -> None:
+        self.fn = fn
+        self.logger = logger
+        self.failed: List[T] = []
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._cancelled = threading.Event()
+        self._slots = threading.Semaphore(2 * max_workers)  # submitted items not done yet
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stream")
+        threading.Thread(target=self._submit, args=(items,), name="stream-items", daemon=True).start()
+
+    def _submit(self, items: Iterable[T]):
+        count = 0
+        try:
+            for item in items:
+                while not self._slots.acquire(timeout=0.1):
+                    if self._cancelled.is_set():
+                        return
+                if self._cancelled.is_set():
+                    return
+                self._executor.submit(self._work, item)
+                count += 1
+        except Exception as e:
+            if not self._cancelled.is_set():  # otherwise the executor is shut down meanwhile
+                self.logger.error(f"Stream items failed: {e}")
+                self.failed.append(e)
+        finally:
+            self._put(_Submitted(count))
+
+    def _work(self, item: T):
+        try:
+            for batch in self.fn(item):
+                if not self._put(batch):
+                    break
+        except Exception as e:
+            self.logger.error(f"Stream failed: {item}: {e}")
+            self.failed.append(item)
+        finally:
+            self._slots.release()
+            self._put(_DONE)
+
+    def _put(self, batch) -> bool:
+        while not self._cancelled.is_set():
+            try:
+                self._queue.put(batch, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __iter__(self) -> Iterator[List[R]]:
+        done = 0
+        submitted: Optional[int] = None  # known once all items were submitted
+        while (submitted is None or done < submitted) and not self._cancelled.is_set():
+            try:
+                batch = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if batch is _DONE:
+                done += 1
+            elif isinstance(batch, _Submitted):
+                submitted = batch.count
+            else:
+                yield batch
+        self.cancel()
+
+    def cancel(self):
+        self._cancelled.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
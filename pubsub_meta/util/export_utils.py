@@ -0,0 +1,51 @@
+import csv
+import json
+import os
+from typing import IO, TYPE_CHECKING, Any, Dict, Iterable, List
+
+if TYPE_CHECKING:  # imported by cli, kept light for startup
+    from pubsub_meta.util.concurrent_utils import BatchStream
+
+FORMATS = ["jsonl", "csv"]
+
+Record = Dict[str, Any]
+
+
+class RecordWriter:
+    """
+    Writes records as JSON lines or CSV rows, nested values of CSV rows are JSON encoded
+    """
+
+    def __init__(self, stream: IO[str], fmt: str, fields: List[str]) -> None:
+        self.stream = stream
+        self.csv = None
+        if fmt == "csv":
+            self.csv = csv.DictWriter(stream, fieldnames=fields, restval="", extrasaction="ignore")
+            self.csv.writeheader()
+
+    def write(self, records: Iterable[Record]):
+        for record in records:
+            if self.csv:
+                self.csv.writerow({field: _csv_value(value) for field, value in record.items()})
+            else:
+                self.stream.write(json.dumps(record, default=str) + "\n")
+        self.stream.flush()  # consumers see every batch as soon as it arrives
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return value
+
+
+def write_records(records: "BatchStream", stream: IO[str], fmt: str, fields: List[str]):
+    """
+    Write batches of records as they arrive, stopping the stream when the reader goes away (e.g. `| head`)
+    """
+    try:
+        writer = RecordWriter(stream, fmt, fields)
+        for batch in records:
+            writer.write(batch)
+    except BrokenPipeError:
+        records.cancel()
+        os.dup2(os.open(os.devnull, os.O_WRONLY), stream.fileno())  # python would fail flushing it again at exit
@@ -0,0 +1,20 @@
+import os
+import tempfile
+from pathlib import Path
+
+
+def atomic_write(path: str, content: str):
+    """
+    Write content into temporary file next to the path, then rename it over the path
+    """
+    directory = os.path.dirname(path)
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
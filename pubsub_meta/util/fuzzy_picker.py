@@ -0,0 +1,208 @@
+import heapq
+import threading
+import time
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional
+
+import readchar
+from readchar import key
+from rich.console import Group
+from rich.live import Live
+from rich.panel import Panel
+from rich.rule import Rule
+from rich.text import Text
+
+from pubsub_meta import const
+
+INDEX_CHUNK = 5_000  # names indexed per lock hold, keeps the picker responsive while indexing
+REDRAW_INTERVAL = 0.1  # seconds, between redraws caused by arriving names
+
+
+def _trigrams(text: str) -> set:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    Names with posting lists of their lowercase trigrams, prefiltering candidates of a search
+    """
+
+    def __init__(self) -> None:
+        self.names: List[str] = []
+        self.lowered: List[str] = []
+        self.postings: Dict[str, array] = {}
+        self.lock = threading.Lock()
+        self._last: tuple = ("", -1, [])  # query, index size and matching ids of the previous search
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, names: List[str]):
+        for i in range(0, len(names), INDEX_CHUNK):
+            with self.lock:
+                for name in names[i : i + INDEX_CHUNK]:
+                    idx = len(self.names)
+                    lowered = name.lower()
+                    self.names.append(name)
+                    self.lowered.append(lowered)
+                    for trigram in _trigrams(lowered):
+                        posting = self.postings.get(trigram)
+                        if posting is None:
+                            posting = self.postings[trigram] = array("I")
+                        posting.append(idx)
+
+    def search(self, query: str, limit: int) -> tuple[List[str], int]:
+        """
+        Best `limit` names containing every space separated term of query, and total number of matches.
+        Falls back to subsequence matching when nothing contains the terms.
+        """
+        terms = query.lower().split()
+        with self.lock:
+            if not terms:
+                return self.names[:limit], len(self.names)
+            last_query, last_size, last_ids = self._last
+            if last_size == len(self.names) and last_ids and query.startswith(last_query):
+                candidates = last_ids  # extending the query only narrows the previous matches
+            else:
+                candidates = self._candidates(terms)
+            lowered = self.lowered
+            scored = []
+            for idx in candidates:
+                name = lowered[idx]
+                if all(term in name for term in terms):
+                    scored.append((name.find(terms[0]), len(name), idx))
+            self._last = (query, len(self.names), [idx for _, _, idx in scored])
+            if not scored:
+                joined = "".join(terms)
+                for idx, name in enumerate(lowered):
+                    span = _subsequence_span(joined, name)
+                    if span is not None:
+                        scored.append((span, len(name), idx))
+            best = heapq.nsmallest(limit, scored)
+            return [self.names[idx] for _, _, idx in best], len(scored)
+
+    def _candidates(self, terms: List[str]) -> Iterable[int]:
+        trigrams = set()
+        for term in terms:
+            trigrams |= _trigrams(term)
+        if not trigrams:
+            return range(len(self.names))
+        postings = sorted((self.postings.get(trigram, array("I")) for trigram in trigrams), key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(posting)
+        return sorted(candidates)
+
+
+def _subsequence_span(query: str, name: str) -> Optional[int]:
+    start = pos = name.find(query[0]) if query else 0
+    if pos < 0:
+        return None
+    for char in query[1:]:
+        pos = name.find(char, pos + 1)
+        if pos < 0:
+            return None
+    return pos - start
+
+
+class FuzzyPicker:
+    """
+    Picker rendered inside of the live display, choices are indexed as they arrive
+    """
+
+    def __init__(self, live: Live) -> None:
+        self.live = live
+        self.index = TrigramIndex()
+        self.query = ""
+        self.selected = 0
+        self.matches: List[str] = []
+        self.matched_query: Optional[str] = None  # query the shown matches were ranked for
+        self.total = 0
+        self.loading = True
+        self.closed = False
+        self._redraw_lock = threading.Lock()
+        self._last_redraw = 0.0
+
+    def pick(self, batches: Iterable[List[str]], on_close: Callable[[], None] = lambda: None) -> Optional[str]:
+        loader = threading.Thread(target=self._load, args=(batches,), name="picker", daemon=True)
+        loader.start()
+        try:
+            return self._read()
+        finally:
+            with self._redraw_lock:
+                self.closed = True  # late batches must not draw over the window
+            on_close()
+
+    def _load(self, batches: Iterable[List[str]]):
+        for batch in batches:
+            if self.closed:
+                return
+            self.index.add(batch)
+            if time.monotonic() - self._last_redraw > REDRAW_INTERVAL:
+                self._redraw()
+        self.loading = False
+        self._redraw()
+
+    def _read(self) -> Optional[str]:
+        self._redraw()
+        while True:
+            try:
+                char = readchar.readkey()
+            except KeyboardInterrupt:
+                return None
+            match char:
+                case key.ESC:
+                    return None
+                case key.ENTER | key.LF:
+                    with self._redraw_lock:  # row under the cursor, not moved by the loader meanwhile
+                        return self.matches[self.selected] if self.matches else None
+                case key.UP:
+                    self.selected = max(self.selected - 1, 0)
+                case key.DOWN:
+                    self.selected = min(self.selected + 1, max(len(self.matches) - 1, 0))
+                case key.BACKSPACE:
+                    self.query = self.query[:-1]
+                    self.selected = 0
+                case _ if len(char) == 1 and char.isprintable():
+                    self.query += char
+                    self.selected = 0
+            self._redraw()
+
+    def _redraw(self):
+        """
+        While the query is unchanged, shown rows stay in place and matches of arriving names are appended.
+        Selection follows the selected name.
+        """
+        with self._redraw_lock:
+            if self.closed:
+                return
+            self._last_redraw = time.monotonic()
+            limit = max(self.live.console.height - 6, 1)
+            selected = self.matches[self.selected] if self.matches else None
+            matches, self.total = self.index.search(self.query, limit)
+            if self.query == self.matched_query:
+                shown = set(self.matches)
+                matches = (self.matches + [match for match in matches if match not in shown])[:limit]
+                if selected in matches:
+                    self.selected = matches.index(selected)
+            self.matches = matches
+            self.matched_query = self.query
+            self.selected = min(self.selected, max(len(self.matches) - 1, 0))
+            self.live.update(self._panel(), refresh=True)
+
+    def _panel(self) -> Panel:
+        terms = self.query.split()
+        lines = []
+        for i, match in enumerate(self.matches):
+            text = Text(f"{'●' if i == self.selected else ' '} {match}", style="default")
+            text.highlight_words(terms, style=const.info_style, case_sensitive=False)
+            lines.append(text)
+        prompt = Text("> ", style=const.request_style).append(self.query, style="default")
+        status = f"{self.total}/{len(self.index)}" + (" loading" if self.loading else "")
+        return Panel(
+            Group(prompt, Rule(style=const.darker_style), *lines),
+            subtitle=f"{status} | select (↑↓) | pick (enter) | cancel (esc)",
+            border_style=const.border_style,
+        )
@@ -17,3 +17,21 @@ def bytes_fmt(bytes_opt: Optional[int]) -> str:
 def num_fmt(num_opt: Optional[int]) -> str:
     num = num_opt if num_opt else 0
     return f"{num:,}"
+
+
+def duration_fmt(seconds: float) -> str:
+    seconds = int(seconds)
+    parts = [(seconds // 86400, "d"), (seconds % 86400 // 3600, "h"), (seconds % 3600 // 60, "m"), (seconds % 60, "s")]
+    shown = [f"{value}{unit}" for value, unit in parts if value][:2]  # two most significant units
+    return " ".join(shown) if shown else "0s"
+
+
+def parse_duration(duration: str) -> float:
+    """
+    Seconds of duration like "30", "15s", "5m" or "1h"
+    """
+    units = {"s": 1, "m": 60, "h": 3600}
+    duration = duration.strip().lower()
+    if duration and duration[-1] in units:
+        return float(duration[:-1]) * units[duration[-1]]
+    return float(duration)
@@ -0,0 +1,95 @@
+import operator
+from array import array
+from bisect import bisect_left
+from itertools import repeat
+from typing import Optional
+
+from pubsub_meta.types import BacklogAnalytics, TimeSeries
+
+
+def lttb(series: TimeSeries, threshold: int) -> TimeSeries:
+    """
+    Largest-triangle-three-buckets downsampling, keeps at most threshold points preserving the visual shape
+    """
+    size = len(series)
+    if threshold >= size or threshold < 3:
+        return series
+    xs, ys = series.timestamps, series.values
+    sampled = TimeSeries(array("d", [xs[0]]), array("d", [ys[0]]))
+    every = (size - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, size)
+        avg_x = sum(xs[avg_start:avg_end]) / (avg_end - avg_start)
+        avg_y = sum(ys[avg_start:avg_end]) / (avg_end - avg_start)
+
+        bucket_start = int(i * every) + 1
+        bucket_end = int((i + 1) * every) + 1
+        ax, ay = xs[a], ys[a]
+        max_area = -1.0
+        for j in range(bucket_start, bucket_end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > max_area:
+                max_area = area
+                a = j
+        sampled.timestamps.append(xs[a])
+        sampled.values.append(ys[a])
+
+    sampled.timestamps.append(xs[-1])
+    sampled.values.append(ys[-1])
+    return sampled
+
+
+def _since(series: TimeSeries, since: float) -> TimeSeries:
+    start = bisect_left(series.timestamps, since)
+    return TimeSeries(series.timestamps[start:], series.values[start:])
+
+
+def mean(series: TimeSeries, since: float) -> Optional[float]:
+    recent = _since(series, since)
+    return sum(recent.values) / len(recent) if recent else None
+
+
+def slope(series: TimeSeries, since: float) -> Optional[float]:
+    """
+    Least squares slope of points after since, per second. Sums run over whole arrays, no per-point python code.
+    """
+    recent = _since(series, since)
+    n = len(recent)
+    if n < 2:
+        return None
+    xs = array("d", map(operator.sub, recent.timestamps, repeat(recent.timestamps[0], n)))  # precision of products
+    ys = recent.values
+    sum_x, sum_y = sum(xs), sum(ys)
+    sum_xx, sum_xy = sum(map(operator.mul, xs, xs)), sum(map(operator.mul, xs, ys))
+    denominator = n * sum_xx - sum_x * sum_x
+    return (n * sum_xy - sum_x * sum_y) / denominator if denominator else None
+
+
+def backlog_analytics(
+    backlog: TimeSeries, oldest_unacked_age: TimeSeries, ack_rate: TimeSeries, nack_rate: TimeSeries, span: float
+) -> BacklogAnalytics:
+    """
+    Drain rate is the backlog's trend over the last span, i.e. consume rate net of publishing.
+    ETA assumes the backlog keeps shrinking at that rate.
+    """
+    if not backlog:
+        return BacklogAnalytics()
+    since = backlog.timestamps[-1] - span
+    current = backlog.values[-1]
+    trend = slope(backlog, since)
+    drain_rate = -trend if trend is not None else None
+    drain_eta = None
+    if current <= 0:
+        drain_eta = 0.0
+    elif drain_rate and drain_rate > 0:
+        drain_eta = current / drain_rate
+    return BacklogAnalytics(
+        backlog=current,
+        oldest_unacked_age=oldest_unacked_age.values[-1] if oldest_unacked_age else None,
+        ack_rate=mean(ack_rate, since),
+        nack_rate=mean(nack_rate, since),
+        drain_rate=drain_rate,
+        drain_eta=drain_eta,
+    )
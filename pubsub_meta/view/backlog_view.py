@@ -0,0 +1,87 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Callable, List, Optional, Tuple
+
+from pubsub_meta import const, output
+from pubsub_meta.logger import Logger
+from pubsub_meta.service.metrics_service import MIN_ALIGNMENT_PERIOD, MetricsService
+from pubsub_meta.types import SubscriptionParsed
+from pubsub_meta.util.num_utils import duration_fmt, num_fmt
+from rich.layout import Layout
+from rich.table import Table
+
+TOP_N = 20
+RANKINGS = {  # metric -> title, value format
+    "num_undelivered_messages": ("Largest backlog", lambda value: num_fmt(int(value))),
+    "oldest_unacked_message_age": ("Oldest unacked message", duration_fmt),
+}
+
+Top = List[Tuple[float, SubscriptionParsed]]
+
+
+class BacklogView:
+    """
+    Subscriptions ranked across all projects, one grouped query per project and ranking
+    """
+
+    def __init__(
+        self,
+        logger: Logger,
+        metrics_service: MetricsService,
+        project_ids: Callable[[], List[str]],
+        offline: bool = False,
+    ) -> None:
+        self.logger = logger
+        self.metrics_service = metrics_service
+        self.project_ids = project_ids
+        self.offline = offline  # rankings need Monitoring, nothing is shown
+        self.executor = ThreadPoolExecutor(max_workers=len(RANKINGS), thread_name_prefix="backlog")
+        self.on_update: Callable[[], None] = lambda: None  # called whenever a ranking gets its data
+        self._key: Optional[datetime] = None
+        self._layout: Optional[Layout] = None
+
+    def get_backlog_output(self, now: datetime) -> Layout:
+        """
+        Layout with placeholders right away, rankings are filled in once they arrive
+        """
+        if self.offline:
+            return Layout(output.placeholder("backlog", "not available offline"))
+        if self._key and timedelta(0) <= now - self._key < timedelta(seconds=MIN_ALIGNMENT_PERIOD):
+            return self._layout  # metrics are sampled once a minute, refreshing sooner brings nothing new
+
+        layout = Layout()
+        deadline = time.monotonic() + const.PUBSUB_META_METRICS_DEADLINE
+        rankings = []
+        for metric, (title, fmt) in RANKINGS.items():
+            ranking = Layout(output.placeholder(title, "loading"))
+            future = self.executor.submit(self._top, metric, now, deadline)
+            future.add_done_callback(partial(self._fill, ranking, title, fmt))
+            rankings.append(ranking)
+        layout.split_row(*rankings)
+        self._key = now
+        self._layout = layout
+        return layout
+
+    def _top(self, metric: str, now: datetime, deadline: float) -> Top:
+        return self.metrics_service.top_subscriptions(self.project_ids(), metric, TOP_N, now, deadline)
+
+    def _fill(self, ranking: Layout, title: str, fmt: Callable[[float], str], future: Future):
+        try:
+            ranking.update(_table(title, fmt, future.result()))
+        except Exception as e:
+            self.logger.error(f"{title} failed: {e}")
+            ranking.update(output.placeholder(title, "failed"))
+        self.on_update()
+
+
+def _table(title: str, fmt: Callable[[float], str], top: Top) -> Table:
+    table = Table(title=title, title_style="default", box=None, expand=True, header_style=const.key_style)
+    table.add_column("#", style=const.darker_style, justify="right")
+    table.add_column("Project", style=const.darker_style)
+    table.add_column("Subscription", style="default")
+    table.add_column("Value", style=const.info_style, justify="right")
+    for rank, (value, sub) in enumerate(top, start=1):
+        table.add_row(str(rank), sub.project_id, sub.subscription_id, fmt(value))
+    return table
@@ -1,39 +1,211 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
 
-from google.pubsub_v1.types.pubsub import Subscription
+from google.pubsub_v1.types.pubsub import Subscription, Topic
+from pubsub_meta import const, output
 from pubsub_meta.graph import Graph
 from pubsub_meta.logger import Logger
 from pubsub_meta.service.metrics_service import MetricsService
-from pubsub_meta.types import SubscriptionParsed
+from pubsub_meta.types import BacklogAnalytics, SubscriptionParsed, TimeSeries
+from pubsub_meta.util.num_utils import duration_fmt, num_fmt
+from pubsub_meta.util.series_utils import backlog_analytics
 from rich.layout import Layout
-from rich.console import NewLine
-from rich.panel import Panel
+from rich.console import Group, NewLine
+from rich.text import Text
+
+SUBSCRIPTION_METRICS = [
+    "sent_message_count",
+    "num_undelivered_messages",
+    "oldest_unacked_message_age",
+    "ack_message_count",
+]
+TOPIC_METRICS = ["send_request_count", "byte_cost", "message_sizes"]
+SUBSCRIPTIONS_BACKLOG = "subscriptions backlog"
+GRAPH_WIDTH = 60
+ANALYTICS_WIDTH = 40
+DRAIN_SPAN = 600  # seconds, backlog trend the drain rate is estimated from
+
+LAYOUTS_KEPT = 4  # switching between topic and subscription metrics reuses their layouts
+
+Fetch = Callable[[float], Dict[str, TimeSeries]]  # timeout -> series by metric
+LayoutKey = Tuple[str, str, datetime]  # kind, name, time
 
 
 class MetricsView:
-    def __init__(self, logger: Logger, metrics_service: MetricsService) -> None:
+    def __init__(self, logger: Logger, metrics_service: MetricsService, offline: bool = False) -> None:
         self.logger = logger
         self.metrics_service = metrics_service
+        self.offline = offline  # metrics are not cached locally, nothing is shown
+        self.executor = ThreadPoolExecutor(max_workers=const.PUBSUB_META_WORKERS, thread_name_prefix="metrics")
+        self.on_update: Callable[[], None] = lambda: None  # called whenever graphs get their data
+        self._layouts: Dict[LayoutKey, Layout] = {}  # recent ones, oldest first
 
     def get_metrics_output(self, sub: Subscription, now: datetime) -> Layout:
+        """
+        Layout with placeholders right away, graphs are filled in once their series arrive
+        """
+        if self.offline:
+            return Layout(output.placeholder("metrics", "not available offline"))
+        key = ("subscription", sub.name, now)
+        if key in self._layouts:
+            return self._layouts[key]
+
         layout = Layout()
         row1 = Layout(size=15)
+        row2 = Layout(size=15)
         sub_parsed = SubscriptionParsed.from_subscription(sub.name)
+        deadline = time.monotonic() + const.PUBSUB_META_METRICS_DEADLINE
+
+        def fetch(metric: str) -> Fetch:
+            def inner(timeout: float) -> Dict[str, TimeSeries]:
+                series = self.metrics_service.list_time_series_batch(
+                    [sub_parsed], [metric], now, timeout, points=GRAPH_WIDTH
+                )
+                return {metric: series[(sub_parsed, metric)]}
+
+            return inner
+
+        graphs = {}
+        futures = []
+        for metric in SUBSCRIPTION_METRICS:  # Monitoring accepts one metric type per request, fetched concurrently
+            metric_graphs, future = self._graph_layouts([metric], deadline, fetch(metric))
+            graphs.update(metric_graphs)
+            futures.append(future)
+        futures.append(self.executor.submit(_fetch, deadline, fetch("nack_requests")))  # not graphed
+        analytics = self._analytics_layout(futures)
+
+        row1.split_row(graphs["sent_message_count"], graphs["num_undelivered_messages"], analytics, NewLine())
+        row2.split_row(graphs["oldest_unacked_message_age"], graphs["ack_message_count"], NewLine())
+        layout.split_column(row1, row2)
+        self._keep(key, layout)
+        return layout
+
+    def get_topic_metrics_output(self, topic: Topic, now: datetime, subscriptions: Callable[[], List[str]]) -> Layout:
+        """
+        Topic graphs and backlog summed over topic's subscriptions, every graph is fetched concurrently
+        """
+        if self.offline:
+            return Layout(output.placeholder("metrics", "not available offline"))
+        key = ("topic", topic.name, now)
+        if key in self._layouts:
+            return self._layouts[key]
+
+        layout = Layout()
+        row1 = Layout(size=15)
+        row2 = Layout(size=15)
+        deadline = time.monotonic() + const.PUBSUB_META_METRICS_DEADLINE
+
+        def fetch(metric: str) -> Fetch:
+            def inner(timeout: float) -> Dict[str, TimeSeries]:
+                return self.metrics_service.list_topic_time_series(topic.name, [metric], now, timeout, GRAPH_WIDTH)
+
+            return inner
 
-        dates, points = self.metrics_service.get_sent_messages(
-            sub_parsed.project_id,
-            sub_parsed.subscription_id,
-            now,
-        )
-        sent_message_count = Layout(Graph(dates, points, "sent_message_count"), size=60)
-
-        dates, points = self.metrics_service.get_undelivered_messages(
-            sub_parsed.project_id,
-            sub_parsed.subscription_id,
-            now,
-        )
-        num_undelivered_messages = Layout(Graph(dates, points, "num_undelivered_messages"), size=60)
-
-        row1.split_row(sent_message_count, num_undelivered_messages, NewLine())
-        layout.split_column(row1)
+        def backlog(timeout: float) -> Dict[str, TimeSeries]:
+            series = self.metrics_service.get_backlog_rollup(subscriptions(), now, timeout, points=GRAPH_WIDTH)
+            return {SUBSCRIPTIONS_BACKLOG: series}
+
+        graphs = {}
+        for metric in TOPIC_METRICS:
+            graphs.update(self._graph_layouts([metric], deadline, fetch(metric))[0])
+        graphs.update(self._graph_layouts([SUBSCRIPTIONS_BACKLOG], deadline, backlog)[0])
+
+        row1.split_row(graphs["send_request_count"], graphs["byte_cost"], NewLine())
+        row2.split_row(graphs["message_sizes"], graphs[SUBSCRIPTIONS_BACKLOG], NewLine())
+        layout.split_column(row1, row2)
+        self._keep(key, layout)
+        return layout
+
+    def _keep(self, key: LayoutKey, layout: Layout):
+        self._layouts[key] = layout
+        while len(self._layouts) > LAYOUTS_KEPT:
+            del self._layouts[next(iter(self._layouts))]
+
+    def _graph_layouts(self, metrics: list[str], deadline: float, fetch: Fetch) -> Tuple[Dict[str, Layout], Future]:
+        graphs = {metric: Layout(output.placeholder(metric, "loading"), size=GRAPH_WIDTH) for metric in metrics}
+        future = self.executor.submit(_fetch, deadline, fetch)
+        future.add_done_callback(lambda f: self._fill(graphs, f))
+        return graphs, future
+
+    def _analytics_layout(self, futures: List[Future]) -> Layout:
+        """
+        Backlog analytics, filled in once series of all futures arrive
+        """
+        layout = Layout(output.placeholder("backlog", "loading"), size=ANALYTICS_WIDTH)
+        remaining = len(futures)
+        lock = threading.Lock()
+
+        def on_done(_: Future):
+            nonlocal remaining
+            with lock:
+                remaining -= 1
+                if remaining:
+                    return
+            self._fill_analytics(layout, futures)
+
+        for future in futures:
+            future.add_done_callback(on_done)
         return layout
+
+    def _fill_analytics(self, layout: Layout, futures: List[Future]):
+        try:
+            series: Dict[str, TimeSeries] = {}
+            for future in futures:
+                series.update(future.result())
+            analytics = backlog_analytics(
+                series["num_undelivered_messages"],
+                series["oldest_unacked_message_age"],
+                series["ack_message_count"],
+                series["nack_requests"],
+                DRAIN_SPAN,
+            )
+            layout.update(_analytics(analytics))
+        except Exception as e:
+            self.logger.error(f"Backlog analytics failed: {e}")
+            layout.update(output.placeholder("backlog", "failed"))
+        self.on_update()
+
+    def _fill(self, graphs: Dict[str, Layout], future: Future):
+        try:
+            series = future.result()
+            for metric, graph_layout in graphs.items():
+                graph_layout.update(Graph(series[metric], metric))
+        except Exception as e:
+            self.logger.error(f"Metrics {list(graphs)} failed: {e}")
+            for metric, graph_layout in graphs.items():
+                graph_layout.update(output.placeholder(metric, "failed"))
+        self.on_update()
+
+
+def _fetch(deadline: float, fetch: Fetch) -> Dict[str, TimeSeries]:
+    timeout = deadline - time.monotonic()
+    if timeout <= 0:
+        raise TimeoutError("Metrics deadline exceeded")
+    return fetch(timeout)
+
+
+def _analytics(analytics: BacklogAnalytics) -> Group:
+    def rate(value: Optional[float]) -> str:
+        return f"{value:,.1f}/s" if value is not None else "-"
+
+    if analytics.backlog is None:
+        eta = Text("-", style=const.darker_style)
+    elif analytics.drain_eta == 0:
+        eta = Text("empty", style=const.info_style)
+    elif analytics.drain_eta is not None:
+        eta = Text(duration_fmt(analytics.drain_eta), style=const.info_style)
+    else:
+        eta = Text("not draining", style=const.error_style)  # consumers are not keeping up
+    age = analytics.oldest_unacked_age
+    return Group(
+        NewLine(),
+        output.text_tuple("Backlog", num_fmt(int(analytics.backlog)) if analytics.backlog is not None else "-"),
+        output.text_tuple("Oldest unacked", duration_fmt(age) if age is not None else "-"),
+        output.text_tuple("Ack rate", rate(analytics.ack_rate)),
+        output.text_tuple("Nack rate", rate(analytics.nack_rate)),
+        output.text_tuple("Drain rate", rate(analytics.drain_rate)),
+        output.text_tuple("Drain ETA", eta),
+    )
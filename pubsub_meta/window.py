@@ -1,6 +1,11 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from functools import partial
+from typing import Any, Dict, Optional, Set, Tuple
 
 import click
 import readchar
@@ -16,6 +21,7 @@ from pubsub_meta.config import Config
 from pubsub_meta.logger import Logger
 from pubsub_meta.service.history_service import HistoryService
 from pubsub_meta.service.metrics_service import MetricsService
+from pubsub_meta.view.backlog_view import BacklogView
 from pubsub_meta.view.metrics_view import MetricsView
 from pubsub_meta.service.subscription_service import SubscriptionService
 from pubsub_meta.service.topic_service import TopicService
@@ -28,6 +34,7 @@ class Nav(Enum):
     subscription = 2
     snapshots = 3
     schemas = 4
+    backlog = 5
 
 
 class Tab(Enum):
@@ -35,6 +42,22 @@ class Tab(Enum):
     metrics = 2
 
 
+class Region(Enum):
+    header = 1
+    nav = 2
+    tabs = 3
+    content = 4
+
+
+class WindowEvent(Enum):
+    key = 1
+    refreshed = 2
+    version = 3
+
+
+REFRESH_MAX_BACKOFF = 300  # seconds
+
+
 class Window:
     def __init__(
         self,
@@ -45,6 +68,8 @@ class Window:
         subscription_service: SubscriptionService,
         history_service: HistoryService,
         metrics_service: MetricsService,
+        refresh_interval: Optional[float] = None,
+        offline: bool = False,
     ):
         self.console: Console = console
         self.logger: Logger = logger
@@ -53,36 +78,67 @@ class Window:
         self.topic_service: TopicService = topic_service
         self.history_service: HistoryService = history_service
         self.metrics_service: MetricsService = metrics_service
-        self.metrics_view: MetricsView = MetricsView(logger, metrics_service)
-        self.layout: Layout = Layout()
+        self.metrics_view: MetricsView = MetricsView(logger, metrics_service, offline)
+        project_ids = topic_service.project_service.list_projects
+        self.backlog_view: BacklogView = BacklogView(logger, metrics_service, project_ids, offline)
+        self.regions: Dict[Region, Layout] = {}
+        self.dirty: Set[Region] = set(Region)
         self.content: Optional[RenderableType] = None
         self.nav: Nav = Nav.topic
         self.tab: Tab = Tab.detail
-        self.subtitle: str = "open (o) | refresh (r) | history (h) | quit (q)"
+        self.subtitle: str = "open (o) | global (g) | refresh (r) | history (h) | clear cache (c) | quit (q)"
+        self.refresh_interval: Optional[float] = refresh_interval  # seconds, auto refresh when set
+        self.offline: bool = offline  # only locally cached data, no revalidation nor refresh
+        self.events: "queue.Queue[Tuple[WindowEvent, Any]]" = queue.Queue()
+        self._key_handled = threading.Event()  # key reader waits, so it doesn't compete with fzf for input
+        self._refresh_pending = threading.Event()
         self.sub: Optional[Subscription] = None
         self.sub_parsed: Optional[SubscriptionParsed] = None
         self.topic: Optional[Topic] = None
         self.now: datetime = datetime.utcnow()
+        self.panel: Panel = self._window_panel()
+        self.layout: Layout = Layout(self.panel)
 
     def live_window(self):
+        """
+        First frame is painted from locally cached topic and subscription, both revalidated in the background
+        """
         self.now = datetime.utcnow()
-        self.topic = self.history_service.last_topic()
-        self.sub = self.history_service.last_subscription()
+        self.topic = self.history_service.cached_topic()
+        self.sub = self.history_service.cached_subscription()
         with Live(self.layout, auto_refresh=False, screen=True, transient=True) as live:
+            self.metrics_view.on_update = live.refresh
+            self.backlog_view.on_update = live.refresh
+            threading.Thread(target=self._read_keys, name="keys", daemon=True).start()
+            if not self.offline:
+                threading.Thread(target=self._revalidate, name="revalidate", daemon=True).start()
+            if self.refresh_interval and not self.offline:
+                threading.Thread(target=self._auto_refresh, name="refresh", daemon=True).start()
             self._loop(live)
 
-    def _update_panel(self, live: Live) -> None:
+    def on_version(self):
+        """
+        Available version was checked, may be called from any thread
+        """
+        self.events.put((WindowEvent.version, None))
+
+    def _window_panel(self) -> Panel:
+        """
+        Window structure is built once, regions are filled in by _update_panel
+        """
         window_layout = Layout(name="window")
         body_layout = Layout(name="body")
         tabs_content_layout = Layout(name="tabs_content")
-        header_layout = output.header_layout(self.config)
-        nav_layout = output.nav_layout(list(Nav), self.nav)
-        content_layout = output.content_layout(self.content)
-        tabs_layout = output.tabs_layout(list(Tab), self.tab)
-        tabs_content_layout.split_column(tabs_layout, content_layout)
-        body_layout.split_row(nav_layout, tabs_content_layout)
-        window_layout.split_column(header_layout, body_layout)
-        self.panel = Panel(
+        self.regions = {
+            Region.header: Layout(name="header", size=4),
+            Region.nav: Layout(name="nav", size=20),
+            Region.tabs: Layout(name="tab", size=3),
+            Region.content: Layout(name="content"),
+        }
+        tabs_content_layout.split_column(self.regions[Region.tabs], self.regions[Region.content])
+        body_layout.split_row(self.regions[Region.nav], tabs_content_layout)
+        window_layout.split_column(self.regions[Region.header], body_layout)
+        return Panel(
             title=self.now.strftime("%Y-%m-%d %H:%M:%S UTC"),
             title_align="right",
             subtitle=self.subtitle,
@@ -90,14 +146,35 @@ class Window:
             border_style=const.border_style,
             padding=0,
         )
-        self.layout = Layout(self.panel)
+
+    def _update_panel(self, live: Live) -> None:
+        """
+        Rebuild only the regions marked as dirty
+        """
+        if Region.header in self.dirty:
+            self.regions[Region.header].update(output.header_layout(self.config))
+        if Region.nav in self.dirty:
+            self.regions[Region.nav].update(output.nav_layout(list(Nav), self.nav))
+        if Region.tabs in self.dirty:
+            self.regions[Region.tabs].update(output.tabs_layout(list(Tab), self.tab))
+        if Region.content in self.dirty:
+            self._update_content()
+            self.regions[Region.content].update(output.content_layout(self.content))
+        self.dirty.clear()
+        self.panel.title = self.now.strftime("%Y-%m-%d %H:%M:%S UTC")
         live.update(self.layout, refresh=True)
 
     def _update_content(self):
         self.logger.info(f"Content: {self.nav}, {self.tab}")
         match (self.nav, self.tab):
             case (Nav.topic, Tab.detail) if self.topic:
-                self.content = output.get_topic_output(self.topic)
+                attached = self.topic_service.attached_subscriptions(self.topic.name)
+                self.content = output.get_topic_output(self.topic, attached)
+            case (Nav.topic, Tab.metrics) if self.topic:
+                subscriptions = partial(self.topic_service.topic_subscriptions, self.topic.name)
+                self.content = self.metrics_view.get_topic_metrics_output(self.topic, self.now, subscriptions)
+            case (Nav.backlog, _):
+                self.content = self.backlog_view.get_backlog_output(self.now)
             case (Nav.subscription, Tab.detail) if self.sub:
                 self.content = output.get_subscription_output(self.sub)
             case (Nav.subscription, Tab.metrics) if self.sub:
@@ -118,12 +195,103 @@ class Window:
 
     def _loop(self, live: Live):
         """
-        Loop listening on specific keypress, updating live CLI
+        Loop handling keypresses and background refreshes, updating live CLI, until quitted (q)
+        """
+        self._key_handled.set()
+        while True:
+            self._update_panel(live)
+            event, value = self.events.get()
+            state = (self.nav, self.tab, self.topic, self.sub, self.now)
+            match event:
+                case WindowEvent.key:
+                    self._on_key(value, live)
+                    self._key_handled.set()
+                case WindowEvent.refreshed:
+                    self._on_refreshed(*value)
+                case WindowEvent.version:
+                    self.dirty.add(Region.header)
+            self._mark_dirty(*state)
+
+    def _read_keys(self):
+        while True:
+            self._key_handled.wait()
+            self._key_handled.clear()
+            try:
+                char = readchar.readkey()
+            except KeyboardInterrupt:
+                char = "q"
+            self.events.put((WindowEvent.key, char))
+
+    def _revalidate(self):
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="revalidate") as executor:
+            topic = executor.submit(self.history_service.last_topic)
+            sub = executor.submit(self.history_service.last_subscription)
+            self._refresh_pending.set()
+            self.events.put((WindowEvent.refreshed, (self._result(topic), self._result(sub), datetime.utcnow())))
+
+    def _revalidate_current(self, topic: Optional[Topic], sub: Optional[Subscription]):
+        """
+        Fetch shown topic and subscription in the background, replacing their snapshots once they arrive
         """
-        self._update_content()
-        self._update_panel(live)
-        char = readchar.readkey()
+        if self.offline or not (topic or sub):
+            return
 
+        def revalidate():
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix="revalidate") as executor:
+                topic_future = executor.submit(self.topic_service.get_topic, topic.name) if topic else None
+                sub_future = executor.submit(self.subscription_service.get_subscription, sub.name) if sub else None
+                fresh_topic = self._result(topic_future) if topic_future else None
+                fresh_sub = self._result(sub_future) if sub_future else None
+                self._refresh_pending.set()
+                self.events.put((WindowEvent.refreshed, (fresh_topic, fresh_sub, None)))  # keeps time of metrics
+
+        threading.Thread(target=revalidate, name="revalidate", daemon=True).start()
+
+    def _result(self, future: Future) -> Any:
+        try:
+            return future.result()
+        except Exception as e:
+            self.logger.error(f"Revalidation failed: {e}")
+            return None
+
+    def _auto_refresh(self):
+        """
+        Re-poll current topic and subscription, backing off on errors. Refreshes not yet applied are coalesced.
+        """
+        delay = self.refresh_interval
+        while True:
+            time.sleep(delay)
+            if self._refresh_pending.is_set():
+                continue
+            try:
+                topic = self.topic_service.get_topic(self.topic.name) if self.topic else None
+                sub = self.subscription_service.get_subscription(self.sub.name) if self.sub else None
+                self._refresh_pending.set()
+                self.events.put((WindowEvent.refreshed, (topic, sub, datetime.utcnow())))
+                delay = self.refresh_interval
+            except Exception as e:
+                delay = min(delay * 2, max(self.refresh_interval, REFRESH_MAX_BACKOFF))  # never below the interval
+                self.logger.error(f"Auto refresh failed, next in {delay}s: {e}")
+
+    def _on_refreshed(self, topic: Optional[Topic], sub: Optional[Subscription], now: Optional[datetime]):
+        self._refresh_pending.clear()
+        self.now = now or self.now
+        if topic and (not self.topic or topic.name == self.topic.name):  # not switched meanwhile
+            self.topic = topic
+            self.history_service.save_topic(topic)
+        if sub and (not self.sub or sub.name == self.sub.name):
+            self.sub = sub
+            self.history_service.save_subscription(sub)
+
+    def _mark_dirty(self, nav: Nav, tab: Tab, topic: Optional[Topic], sub: Optional[Subscription], now: datetime):
+        if nav != self.nav:
+            self.dirty.update([Region.nav, Region.content])
+        if tab != self.tab:
+            self.dirty.update([Region.tabs, Region.content])
+        if topic is not self.topic or sub is not self.sub or now != self.now:
+            self.dirty.add(Region.content)
+
+    def _on_key(self, char: str, live: Live):
         match char:
             case key.UP:
                 idx = max([list(Nav)[0].value, self.nav.value - 1])
@@ -153,6 +321,9 @@ class Window:
             case "4":
                 self.nav = Nav.schemas
 
+            case "5":
+                self.nav = Nav.backlog
+
             case key.F1:
                 self.tab = Tab.detail
 
@@ -169,27 +340,45 @@ class Window:
                 sub = self.subscription_service.pick_subscription(live)
                 self._update_subscription(sub)
 
+            # Global - topic
+            case "g" if self.nav == Nav.topic:
+                topic = self.topic_service.pick_topic_global(live)
+                self._update_topic(topic)
+
+            # Global - subscription
+            case "g" if self.nav == Nav.subscription:
+                sub = self.subscription_service.pick_subscription_global(live)
+                self._update_subscription(sub)
+
             # Refresh
             case "r":
                 flash_panel(live, self.layout, self.panel)
                 self.now = datetime.utcnow()
-                self._update_topic(self.topic)
-                self._update_subscription(self.sub)
+                self._revalidate_current(self.topic, self.sub)
 
             # History - topic
             case "h" if self.nav == Nav.topic:
                 topic = self.history_service.pick_topic(live)
                 self._update_topic(topic)
+                self._revalidate_current(topic, None)  # picked from a snapshot
 
             # History - subscription
             case "h" if self.nav == Nav.subscription:
                 sub = self.history_service.pick_subscription(live)
                 self._update_subscription(sub)
+                self._revalidate_current(None, sub)
+
+            # Clear cache - topic
+            case "c" if self.nav == Nav.topic:
+                flash_panel(live, self.layout, self.panel)
+                self.topic_service.invalidate_cache()
+
+            # Clear cache - subscription
+            case "c" if self.nav == Nav.subscription:
+                flash_panel(live, self.layout, self.panel)
+                self.subscription_service.invalidate_cache()
 
             # Quit program
             case "q":
                 live.stop()
                 click.get_current_context().exit()
-
-        # Infinite loop, until quitted (q)
-        self._loop(live)
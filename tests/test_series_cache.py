@@ -0,0 +1,65 @@
+from typing import List
+
+from pubsub_meta.service.series_cache import Point, SeriesCache, align
+
+PERIOD = 60
+WINDOW = 3600
+KEY = ("project", "subscription", "sent_message_count", PERIOD)
+
+
+def _list_time_series(start: float, end: float) -> List[Point]:
+    """
+    ALIGN_SUM buckets as Monitoring returns them, ending at end and every period before it, after start.
+    Raw samples arrive every 10 seconds.
+    """
+    points = []
+    bucket_end = end
+    while bucket_end > start:
+        samples = range(int(bucket_end - PERIOD) // 10 * 10 + 10, int(bucket_end) + 1, 10)
+        points.append((bucket_end, float(sum(sample % 7 for sample in samples))))
+        bucket_end -= PERIOD
+    return points
+
+
+def _fetch(cache: SeriesCache, now: float) -> List[Point]:
+    end = align(now, PERIOD)
+    start = cache.start([KEY], end, WINDOW, PERIOD)
+    series = cache.merge(KEY, start, end, WINDOW, PERIOD, _list_time_series(start, end))
+    return list(zip(series.timestamps, series.values))
+
+
+def test_overlapping_fetches_merge_to_one_full_fetch():
+    first = 1_600_000_017.5  # off the grid
+    incremental = SeriesCache()
+    _fetch(incremental, first)
+    merged = _fetch(incremental, first + 7 * PERIOD + 23)
+
+    full = _fetch(SeriesCache(), first + 7 * PERIOD + 23)
+    assert merged == full
+    assert len(full) == WINDOW // PERIOD
+
+
+def test_refetch_within_period_keeps_series():
+    now = align(1_600_000_017.5, PERIOD) + 5
+    cache = SeriesCache()
+    before = _fetch(cache, now)
+    assert _fetch(cache, now + 50) == before
+
+
+def test_series_are_keyed_by_period():
+    now = 1_600_000_017.5
+    cache = SeriesCache()
+    _fetch(cache, now)
+    assert cache.start([KEY], align(now, 2 * PERIOD), WINDOW, 2 * PERIOD) == align(now - WINDOW, 2 * PERIOD)
+
+
+def test_series_behind_the_window_are_evicted():
+    now = 1_600_000_017.5
+    cache = SeriesCache()
+    _fetch(cache, now)
+    other = ("project", "other", "sent_message_count", PERIOD)
+    cache.start([other], now + WINDOW / 2, WINDOW, PERIOD)
+    assert len(cache) == 1
+
+    cache.start([other], now + WINDOW + PERIOD, WINDOW, PERIOD)
+    assert len(cache) == 0